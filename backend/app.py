@@ -1,13 +1,23 @@
 from flask import Flask
 from flask_cors import CORS
 from dotenv import load_dotenv
+from startup import import_blueprint, run_startup_task, import_time_report
 
-# Import blueprints
-from templates import templates_bp
-from documentation import documentation_bp
-from importexport import importexport_bp
-from aiworkflow import aiworkflow_bp
-from manualworkflow import manualworkflow_bp
+# Import blueprints (timed, to track cold-start regressions; see /metrics/startup)
+templates_bp = import_blueprint('templates', 'templates_bp')
+documentation_bp = import_blueprint('documentation', 'documentation_bp')
+importexport_bp = import_blueprint('importexport', 'importexport_bp')
+aiworkflow_bp = import_blueprint('aiworkflow', 'aiworkflow_bp')
+manualworkflow_bp = import_blueprint('manualworkflow', 'manualworkflow_bp')
+deploys_bp = import_blueprint('deploys', 'deploys_bp')
+metrics_bp = import_blueprint('metrics', 'metrics_bp')
+
+# Warm up before the first request instead of inside it
+from prompts import load_encoding
+from workflow_fragments import job_fragments
+run_startup_task('tokenizer', load_encoding)
+run_startup_task('workflow_fragments', job_fragments.warm_up)
+print(import_time_report())
 
 # Load environment variables
 load_dotenv()
@@ -24,6 +34,8 @@ app.register_blueprint(documentation_bp, url_prefix='/documentation')
 app.register_blueprint(importexport_bp, url_prefix='/importexport')
 app.register_blueprint(aiworkflow_bp, url_prefix='/aiworkflow')
 app.register_blueprint(manualworkflow_bp, url_prefix='/manualworkflow')
+app.register_blueprint(metrics_bp, url_prefix='/metrics')
+app.register_blueprint(deploys_bp, url_prefix='/deploys')
 
 if __name__ == '__main__':
     app.run(debug=True,host='0.0.0.0')
@@ -0,0 +1,115 @@
+import os
+import hashlib
+import queue
+import threading
+from collections import OrderedDict
+
+# Number of workflow artifacts kept in memory
+ARTIFACT_CACHE_SIZE = int(os.getenv("ARTIFACT_CACHE_SIZE", "256"))
+
+# Directory the write-behind spool persists artifacts to
+ARTIFACT_SPOOL_DIR = os.getenv("ARTIFACT_SPOOL_DIR", "artifacts")
+
+
+class ArtifactStore:
+    """
+    Content-addressed store for generated workflow JSON.
+
+    Artifacts are keyed by a hash of their content and held in an in-memory LRU.
+    A background thread spools them to disk so requests never wait on the write;
+    reads fall back to the spool for artifacts evicted from memory or written by
+    another worker process.
+    """
+
+    def __init__(self, spool_dir, max_items):
+        self.spool_dir = spool_dir
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._spool_writer, name="artifact-spool", daemon=True)
+        self._writer.start()
+
+    @staticmethod
+    def artifact_id(content):
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()[:32]
+
+    def _path(self, artifact_id):
+        return os.path.join(self.spool_dir, f"{artifact_id}.json")
+
+    def put(self, content):
+        """Store workflow JSON and return its id. The disk write happens in the background."""
+        artifact_id = self.artifact_id(content)
+        with self._lock:
+            is_new = artifact_id not in self._items and artifact_id not in self._pending
+            self._items[artifact_id] = content
+            self._items.move_to_end(artifact_id)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+            if is_new:
+                self._pending[artifact_id] = content
+        if is_new:
+            self._queue.put(artifact_id)
+        return artifact_id
+
+    def get(self, artifact_id):
+        """Return the workflow JSON for an id, or None if it is unknown."""
+        if not artifact_id or not all(c in '0123456789abcdef' for c in artifact_id):
+            return None
+
+        with self._lock:
+            content = self._items.get(artifact_id)
+            if content is not None:
+                self._items.move_to_end(artifact_id)
+                return content
+            content = self._pending.get(artifact_id)
+            if content is not None:
+                return content
+
+        try:
+            with open(self._path(artifact_id), 'r') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            self._items[artifact_id] = content
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        return content
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cached": len(self._items),
+                "max_items": self.max_items,
+                "pending_writes": len(self._pending),
+                "spool_dir": self.spool_dir
+            }
+
+    def flush(self):
+        """Block until every queued artifact has been written to the spool."""
+        self._queue.join()
+
+    def _spool_writer(self):
+        while True:
+            artifact_id = self._queue.get()
+            try:
+                with self._lock:
+                    content = self._pending.get(artifact_id)
+                if content is not None and not os.path.exists(self._path(artifact_id)):
+                    os.makedirs(self.spool_dir, exist_ok=True)
+                    temp_path = f"{self._path(artifact_id)}.{threading.get_ident()}.tmp"
+                    with open(temp_path, 'w') as f:
+                        f.write(content)
+                    os.replace(temp_path, self._path(artifact_id))
+            except Exception as e:
+                print(f"WARNING: Failed to spool workflow artifact {artifact_id}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._pending.pop(artifact_id, None)
+                self._queue.task_done()
+
+
+artifact_store = ArtifactStore(ARTIFACT_SPOOL_DIR, ARTIFACT_CACHE_SIZE)
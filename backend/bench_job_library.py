@@ -0,0 +1,60 @@
+"""
+Micro-benchmark: allocations and time per workflow when jobs come from the
+JOB_LIBRARY factories versus the prototype cache (job_library.create_job).
+
+Usage:
+    python bench_job_library.py [jobs_per_workflow] [workflows]
+"""
+import sys
+import time
+import tracemalloc
+from job_library import JOB_LIBRARY, create_job
+
+# Entries with the largest nested payloads are repeated so they weigh as in real demos
+HEAVY_KEYS = ['JobFileTransfer', 'Data_Storage_AWS_S3', 'WebServiceREST']
+
+
+def _workflow_keys(jobs_per_workflow):
+    keys = []
+    for key in list(JOB_LIBRARY.keys()) + HEAVY_KEYS * 10:
+        try:
+            JOB_LIBRARY[key]()
+        except Exception:
+            continue
+        keys.append(key)
+    return [keys[i % len(keys)] for i in range(jobs_per_workflow)]
+
+
+def _measure(label, make_job, keys, workflows):
+    # Warm up (builds prototypes) outside the measurement
+    [make_job(key) for key in keys]
+
+    tracemalloc.start()
+    start_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    jobs = [make_job(key) for key in keys]
+    snapshot = tracemalloc.take_snapshot()
+    retained_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics('filename')) - start_blocks
+    del jobs
+
+    started = time.perf_counter()
+    for _ in range(workflows):
+        [make_job(key) for key in keys]
+    elapsed = (time.perf_counter() - started) / workflows
+
+    print(f"{label:<12} {blocks:>10} blocks {retained_bytes / 1024:>10.1f} KiB {elapsed * 1000:>9.2f} ms per workflow")
+
+
+def main():
+    jobs_per_workflow = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    workflows = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    keys = _workflow_keys(jobs_per_workflow)
+
+    print(f"{jobs_per_workflow} jobs per workflow, timing over {workflows} workflows")
+    _measure("factories", lambda key: JOB_LIBRARY[key](), keys, workflows)
+    _measure("prototypes", create_job, keys, workflows)
+
+
+if __name__ == '__main__':
+    main()
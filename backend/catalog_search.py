@@ -0,0 +1,234 @@
+import os
+import re
+import threading
+from collections import Counter
+import numpy as np
+from job_library import JOB_LIBRARY, create_job, catalog_version
+from prompts import catalog_group
+
+# Technologies offered to the LLM per request (0 sends the whole catalog)
+CATALOG_SHORTLIST_SIZE = int(os.getenv("CATALOG_SHORTLIST_SIZE", "25"))
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Capability vocabulary per technology (matched as a substring of the JOB_LIBRARY key).
+# Job definitions only carry product names; these terms let business use cases match them.
+_CAPABILITY_TERMS = {
+    'Glue': 'etl transform data integration catalog cleansing',
+    'DataBrew': 'data preparation cleansing profiling quality',
+    'Dataprep': 'data preparation cleansing profiling quality',
+    'Athena': 'sql query analytics data lake',
+    'Redshift': 'data warehouse sql analytics reporting',
+    'Synapse': 'data warehouse sql analytics reporting',
+    'BigQuery': 'data warehouse sql analytics reporting',
+    'SageMaker': 'machine learning ml model training prediction forecasting ai',
+    'Machine_Learning': 'machine learning ml model training prediction forecasting ai',
+    'DataScience': 'machine learning ml model training prediction forecasting ai',
+    'QuickSight': 'dashboard reporting visualization bi analytics report',
+    'PowerBI': 'dashboard reporting visualization bi analytics report',
+    'Tableau': 'dashboard reporting visualization bi analytics report',
+    'SNS': 'notification alert messaging event',
+    'SQS': 'queue messaging event decoupling',
+    'Service_Bus': 'queue messaging event notification',
+    'Lambda': 'serverless function event trigger',
+    'Functions': 'serverless function event trigger',
+    'EC2': 'compute server processing',
+    'VM': 'compute server processing',
+    'Batch': 'batch compute processing',
+    'ECS': 'container compute processing',
+    'CloudRun': 'container serverless compute',
+    'AppRunner': 'container application web',
+    'Backup': 'backup recovery disaster compliance archive',
+    'CloudFormation': 'infrastructure provisioning deployment iac',
+    'Resource_Manager': 'infrastructure provisioning deployment iac',
+    'DeploymentManager': 'infrastructure provisioning deployment iac',
+    'Terraform': 'infrastructure provisioning deployment iac',
+    'Ansible': 'configuration automation provisioning deployment',
+    'DevOps': 'ci cd build release pipeline deployment',
+    'Jenkins': 'ci cd build release pipeline deployment',
+    'StepFunctions': 'orchestration workflow pipeline scheduling',
+    'Workflows': 'orchestration workflow pipeline scheduling',
+    'Composer': 'orchestration workflow pipeline scheduling airflow',
+    'MWAA': 'orchestration workflow pipeline scheduling airflow',
+    'Airflow': 'orchestration workflow pipeline scheduling',
+    'LogicApps': 'integration workflow automation orchestration',
+    'DataFactory': 'ingestion integration pipeline etl data movement',
+    'DataPipeline': 'ingestion integration pipeline etl data movement',
+    'Data_Fusion': 'ingestion integration pipeline etl data movement',
+    'DataIntegration': 'ingestion integration pipeline etl data movement',
+    'NiFi': 'ingestion integration streaming data movement',
+    'AppFlow': 'ingestion integration saas data movement',
+    'DataSync': 'data movement transfer replication migration',
+    'EMR': 'big data spark hadoop processing analytics',
+    'HDInsight': 'big data spark hadoop processing analytics',
+    'Dataproc': 'big data spark hadoop processing analytics',
+    'Hadoop': 'big data processing analytics aggregation',
+    'Databricks': 'big data spark processing analytics transformation machine learning',
+    'Dataflow': 'streaming batch processing transformation pipeline',
+    'DataFlow': 'streaming batch processing transformation pipeline spark',
+    'Dataplex': 'data governance catalog quality lake',
+    'DynamoDB': 'database nosql storage',
+    'SQLScript': 'database sql oracle query extraction',
+    'FileTransfer': 'file transfer mft repository collection',
+    'S3': 'storage data lake archive file',
+    'SFDC': 'crm sales customer salesforce',
+    'SAP': 'erp inventory supply chain order',
+    'Market': 'market financial stock trading prices',
+    'Weather': 'weather climate forecast temperature',
+    'SLA': 'sla monitoring service level deadline',
+    'UI_Path': 'rpa robotic process automation',
+    'Automation_Anywhere': 'rpa robotic process automation',
+    'DBT': 'transformation sql modeling analytics',
+    'MainframeModernization': 'mainframe migration cobol legacy modernization',
+    'WebServiceREST': 'api rest web service http integration',
+}
+
+# Provider names as users write them, mapped to the prefix of their JOB_LIBRARY keys
+_PROVIDER_ALIASES = {'amazon': 'aws', 'microsoft': 'azure', 'google': 'gcp', 'oracle': 'oci'}
+
+# Parts of JOB_LIBRARY keys that name a capability rather than a provider or product
+_GENERIC_KEY_PARTS = {
+    'data', 'storage', 'inventory', 'market', 'api', 'weather', 'backup', 'batch', 'vm',
+    'funct', 'service', 'bus', 'machine', 'learn', 'resource', 'manager', 'workflow'
+}
+
+
+def _stem(word):
+    for suffix in ('ing', 'ions', 'ion', 'es', 's', 'ed'):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    """Lowercased word stems; CamelCase and snake_case identifiers are split into words."""
+    text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text or '')
+    return [_stem(word) for word in re.findall(r'[a-z0-9]+', text.lower())]
+
+
+class CatalogIndex:
+    """
+    BM25 index over the JOB_LIBRARY entries, rebuilt when the catalog changes.
+
+    Each entry's document is its key, AAPI job type, object name, description
+    and capability terms.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+
+    def _document(self, key):
+        parts = [key, ' '.join(terms for fragment, terms in _CAPABILITY_TERMS.items() if fragment in key)]
+        try:
+            job = create_job(key)
+            parts += [job._type.replace('Job:', ''), job.object_name, getattr(job, 'description', None) or '']
+        except Exception as e:
+            print(f"WARNING: Could not read job library entry {key} for ranking: {str(e)}")
+        return Counter(tokenize(' '.join(parts)))
+
+    def _build(self, version):
+        keys = list(JOB_LIBRARY.keys())
+        documents = [self._document(key) for key in keys]
+        vocabulary = {}
+        for document in documents:
+            for term in document:
+                vocabulary.setdefault(term, len(vocabulary))
+
+        frequencies = np.zeros((len(keys), len(vocabulary)))
+        for row, document in enumerate(documents):
+            for term, count in document.items():
+                frequencies[row, vocabulary[term]] = count
+
+        lengths = frequencies.sum(axis=1)
+        document_frequency = (frequencies > 0).sum(axis=0)
+        total = len(keys)
+        self._idf = np.log(1 + (total - document_frequency + 0.5) / (document_frequency + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / (lengths.mean() or 1))
+        self._weights = frequencies * (BM25_K1 + 1) / (frequencies + norm[:, None])
+        self._keys = keys
+        self._vocabulary = vocabulary
+        self._version = version
+
+    def rank(self, text):
+        """Return (key, score) pairs for every catalog entry, best match first (ties keep library order)."""
+        with self._lock:
+            version = catalog_version()
+            if self._version != version:
+                self._build(version)
+
+            columns = [self._vocabulary[term] for term in set(tokenize(text)) if term in self._vocabulary]
+            if columns:
+                scores = self._weights[:, columns] @ self._idf[columns]
+            else:
+                scores = np.zeros(len(self._keys))
+            order = np.argsort(-scores, kind='stable')
+            return [(self._keys[i], float(scores[i])) for i in order]
+
+
+catalog_index = CatalogIndex()
+
+_technology_vocabulary = (None, frozenset())
+_technology_lock = threading.Lock()
+
+
+def technology_terms(text):
+    """
+    Providers and products of the catalog that a use case names, e.g. ('aws', 's3').
+
+    Words are matched against the parts of JOB_LIBRARY keys, alone and joined
+    with the next word ("Data Factory" matches AZURE_DataFactory). Provider
+    aliases (Amazon, Microsoft, Google, Oracle) map to the key prefixes.
+
+    Returns:
+        tuple: Sorted, distinct terms (empty when none are named)
+    """
+    global _technology_vocabulary
+    version = catalog_version()
+    with _technology_lock:
+        if _technology_vocabulary[0] != version:
+            parts = {_stem(part.lower()) for key in JOB_LIBRARY for part in key.split('_') if part}
+            _technology_vocabulary = (version, frozenset(parts - _GENERIC_KEY_PARTS))
+        vocabulary = _technology_vocabulary[1]
+
+    words = re.findall(r'[a-z0-9]+', (text or '').lower())
+    candidates = [_stem(word) for word in words] + [_stem(a + b) for a, b in zip(words, words[1:])]
+    terms = {_PROVIDER_ALIASES.get(term, term) for term in candidates}
+    return tuple(sorted(terms & vocabulary))
+
+
+def shortlist_technologies(use_case, size=None):
+    """
+    Return the JOB_LIBRARY keys to offer the LLM for a use case, or None to offer the whole catalog.
+
+    The best BM25 matches come first. Remaining slots are filled by the
+    highest-ranked entry of each catalog category (AWS, Azure, GCP, ...)
+    in turn, so the model can still cover every workflow phase.
+    """
+    size = CATALOG_SHORTLIST_SIZE if size is None else size
+    if size <= 0 or size >= len(JOB_LIBRARY):
+        return None
+
+    ranked = catalog_index.rank(use_case)
+    matched = [key for key, score in ranked if score > 0][:max(1, size * 3 // 5)]
+
+    families = {}
+    for key, _ in ranked:
+        if key not in matched:
+            families.setdefault(catalog_group(key), []).append(key)
+
+    shortlist = list(matched)
+    queues = list(families.values())
+    while len(shortlist) < size and queues:
+        for queue in list(queues):
+            if len(shortlist) >= size:
+                break
+            shortlist.append(queue.pop(0))
+            if not queue:
+                queues.remove(queue)
+
+    # Present candidates in library order so the prompt text stays stable for similar use cases
+    selected = set(shortlist)
+    return [key for key in JOB_LIBRARY if key in selected]
@@ -0,0 +1,282 @@
+from flask import Blueprint, request, jsonify
+import os
+import time
+import uuid
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+deploys_bp = Blueprint('deploys', __name__)
+
+# Build/deploy round trips to Control-M running at the same time
+DEPLOY_WORKERS = int(os.getenv("DEPLOY_WORKERS", "4"))
+
+# Deploys accepted but not yet finished; further submissions are rejected with 503
+DEPLOY_QUEUE_LIMIT = int(os.getenv("DEPLOY_QUEUE_LIMIT", "64"))
+
+# Seconds a finished deploy stays queryable
+DEPLOY_RECORD_TTL = int(os.getenv("DEPLOY_RECORD_TTL", "3600"))
+
+# Longest a status request may block waiting for a change
+DEPLOY_MAX_WAIT = float(os.getenv("DEPLOY_MAX_WAIT", "30"))
+
+# Deploys running at the same time against one environment; override per environment
+# with DEPLOY_ENV_CONCURRENCY_<ENVIRONMENT> (e.g. DEPLOY_ENV_CONCURRENCY_SAAS_DEV=1)
+DEPLOY_ENV_CONCURRENCY = int(os.getenv("DEPLOY_ENV_CONCURRENCY", "2"))
+
+FINISHED_STAGES = ('succeeded', 'failed')
+
+
+class DeployQueueFullError(Exception):
+    """Raised when DEPLOY_QUEUE_LIMIT deploys are already queued or running."""
+
+
+def environment_concurrency(environment):
+    """Maximum number of deploys running at once against an environment."""
+    return max(1, int(os.getenv(f"DEPLOY_ENV_CONCURRENCY_{(environment or '').upper()}", DEPLOY_ENV_CONCURRENCY)))
+
+
+class DeployQueue:
+    """
+    Runs workflow build/deploy round trips on a bounded worker pool.
+
+    Every submission gets a deploy id and a record with its stage
+    (queued -> building -> deploying -> succeeded/failed) and final result.
+    Each change bumps the record's version and wakes up long-polling readers.
+
+    Deploys are handed to the pool only while their environment has fewer than
+    environment_concurrency() deploys running; the rest wait in a per-environment
+    FIFO without holding a worker thread.
+    """
+
+    def __init__(self, workers, limit):
+        self.limit = limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="deploy")
+        self._records = {}
+        self._batches = {}
+        self._running = {}  # environment -> deploys handed to the pool
+        self._waiting = {}  # environment -> deque of (deploy_id, task)
+        self._condition = threading.Condition()
+
+    def _update(self, deploy_id, **changes):
+        with self._condition:
+            record = self._records[deploy_id]
+            record.update(changes)
+            record["version"] += 1
+            record["updated_at"] = time.time()
+            self._condition.notify_all()
+
+    def _prune(self, now):
+        expired = [
+            deploy_id for deploy_id, record in self._records.items()
+            if record["stage"] in FINISHED_STAGES and now - record["updated_at"] > DEPLOY_RECORD_TTL
+        ]
+        for deploy_id in expired:
+            del self._records[deploy_id]
+        for batch_id in [batch_id for batch_id, deploy_ids in self._batches.items()
+                         if not any(deploy_id in self._records for deploy_id in deploy_ids)]:
+            del self._batches[batch_id]
+
+    def submit(self, kind, task, context=None):
+        """
+        Queue a deploy task and return its deploy id.
+
+        Args:
+            kind (str): Label of the submitting endpoint (e.g. "ai", "manual")
+            task (callable): task(set_stage) performing the deploy; returns (success, result dict)
+            context (dict): Extra fields reported with the status; "environment" selects the concurrency limit
+
+        Returns:
+            str: The deploy id
+
+        Raises:
+            DeployQueueFullError: If DEPLOY_QUEUE_LIMIT deploys are already pending
+        """
+        return self.submit_many(kind, [(task, context)])[0]
+
+    def submit_many(self, kind, submissions):
+        """
+        Queue several (task, context) deploys at once; all are accepted or none.
+
+        Returns:
+            list: The deploy ids, in submission order
+
+        Raises:
+            DeployQueueFullError: If the deploys do not fit under DEPLOY_QUEUE_LIMIT
+        """
+        now = time.time()
+        deploy_ids = []
+        with self._condition:
+            self._prune(now)
+            pending = sum(1 for record in self._records.values() if record["stage"] not in FINISHED_STAGES)
+            if pending + len(submissions) > self.limit:
+                raise DeployQueueFullError(f"Too many deploys in progress ({pending}); try again shortly")
+
+            for task, context in submissions:
+                deploy_id = uuid.uuid4().hex
+                self._records[deploy_id] = {
+                    "deploy_id": deploy_id,
+                    "kind": kind,
+                    "stage": "queued",
+                    "context": context or {},
+                    "result": None,
+                    "created_at": now,
+                    "updated_at": now,
+                    "version": 0
+                }
+                environment = (context or {}).get("environment")
+                self._waiting.setdefault(environment, deque()).append((deploy_id, task))
+                deploy_ids.append(deploy_id)
+                self._dispatch(environment)
+
+        return deploy_ids
+
+    def _dispatch(self, environment):
+        """Hand waiting deploys of an environment to the pool while it is under its limit. Caller holds the lock."""
+        waiting = self._waiting.get(environment)
+        limit = environment_concurrency(environment)
+        while waiting and self._running.get(environment, 0) < limit:
+            deploy_id, task = waiting.popleft()
+            self._running[environment] = self._running.get(environment, 0) + 1
+            self._executor.submit(self._run, deploy_id, task, environment)
+
+    def _run(self, deploy_id, task, environment):
+        try:
+            success, result = task(lambda stage: self._update(deploy_id, stage=stage))
+        except Exception as e:
+            print(f"DEPLOY {deploy_id} FAILED: {str(e)}")
+            success, result = False, {"error": "Workflow deployment failed", "details": str(e)}
+        finally:
+            with self._condition:
+                self._running[environment] -= 1
+                self._dispatch(environment)
+        self._update(deploy_id, stage="succeeded" if success else "failed", result=result)
+
+    def add_batch(self, deploy_ids):
+        """Group deploy ids under a batch id for batch_status()."""
+        batch_id = uuid.uuid4().hex
+        with self._condition:
+            self._batches[batch_id] = list(deploy_ids)
+        return batch_id
+
+    def batch_status(self, batch_id):
+        """Return the stage counts and records of a batch, or None if the id is unknown."""
+        with self._condition:
+            deploy_ids = self._batches.get(batch_id)
+            if deploy_ids is None:
+                return None
+            items = [dict(self._records[deploy_id]) for deploy_id in deploy_ids if deploy_id in self._records]
+            stages = {}
+            for item in items:
+                stages[item["stage"]] = stages.get(item["stage"], 0) + 1
+            return {
+                "batch_id": batch_id,
+                "done": all(item["stage"] in FINISHED_STAGES for item in items),
+                "stages": stages,
+                "items": items
+            }
+
+    def status(self, deploy_id, since=None, timeout=0):
+        """
+        Return a copy of the deploy record, or None if the id is unknown.
+
+        When since is given, block up to timeout seconds until the record's
+        version moves past it or the deploy finishes.
+        """
+        deadline = time.monotonic() + max(0, timeout)
+        with self._condition:
+            while True:
+                record = self._records.get(deploy_id)
+                if record is None:
+                    return None
+                if since is None or record["version"] > since or record["stage"] in FINISHED_STAGES:
+                    return dict(record)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return dict(record)
+                self._condition.wait(remaining)
+
+    def wait(self, deploy_id):
+        """Block until a deploy finishes and return its record."""
+        with self._condition:
+            while self._records[deploy_id]["stage"] not in FINISHED_STAGES:
+                self._condition.wait()
+            return dict(self._records[deploy_id])
+
+    def stats(self):
+        with self._condition:
+            stages = {}
+            for record in self._records.values():
+                stages[record["stage"]] = stages.get(record["stage"], 0) + 1
+            return {
+                "workers": self._executor._max_workers,
+                "limit": self.limit,
+                "stages": stages,
+                "environments": {
+                    str(environment): {
+                        "running": self._running.get(environment, 0),
+                        "waiting": len(self._waiting.get(environment) or ()),
+                        "limit": environment_concurrency(environment)
+                    }
+                    for environment in set(self._running) | set(self._waiting)
+                }
+            }
+
+
+deploy_queue = DeployQueue(DEPLOY_WORKERS, DEPLOY_QUEUE_LIMIT)
+
+
+def submit_deploy(kind, task, context, wait=False):
+    """
+    Submit a deploy and build the HTTP response for it.
+
+    Returns 202 with the deploy id and status URL, or, when wait is true
+    (legacy blocking clients), the final result once the deploy finishes.
+    """
+    try:
+        deploy_id = deploy_queue.submit(kind, task, context)
+    except DeployQueueFullError as e:
+        return jsonify({"error": str(e)}), 503
+
+    if wait:
+        record = deploy_queue.wait(deploy_id)
+        return jsonify({**record["result"], "deploy_id": deploy_id}), 200 if record["stage"] == "succeeded" else 500
+
+    return jsonify({
+        "message": "Deploy queued",
+        "deploy_id": deploy_id,
+        "stage": "queued",
+        "status_url": f"/deploys/{deploy_id}"
+    }), 202
+
+
+@deploys_bp.route('/<deploy_id>', methods=['GET'])
+def deploy_status(deploy_id):
+    """
+    Stage and result of a queued deploy.
+
+    Long-poll by passing the last seen "version" as ?since=<version>; the
+    request then blocks up to ?wait=<seconds> (capped at DEPLOY_MAX_WAIT)
+    until the stage changes.
+    """
+    try:
+        since = request.args.get('since', type=int)
+        wait = min(request.args.get('wait', default=DEPLOY_MAX_WAIT, type=float), DEPLOY_MAX_WAIT)
+        record = deploy_queue.status(deploy_id, since=since, timeout=wait if since is not None else 0)
+        if record is None:
+            return jsonify({"error": "Deploy not found"}), 404
+        return jsonify(record), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@deploys_bp.route('/batch/<batch_id>', methods=['GET'])
+def batch_status(batch_id):
+    """Per-item stage and result of a batch deploy."""
+    try:
+        status = deploy_queue.batch_status(batch_id)
+        if status is None:
+            return jsonify({"error": "Batch not found"}), 404
+        return jsonify(status), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,321 @@
+import io
+import os
+import shutil
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from llm_cache import ResponseCache
+
+# PyPDF2, pdfplumber, docx, openpyxl and pandas are imported inside the functions that use
+# them: they take most of a second to load and many processes never parse a document.
+# prompts (for count_tokens) is too, so the extraction workers do not load the job library.
+
+# Pages of an uploaded PDF that are read at most
+DOCUMENT_MAX_PAGES = int(os.getenv("DOCUMENT_MAX_PAGES", "60"))
+
+# Tokens of extracted text after which the remaining pages are skipped
+DOCUMENT_TOKEN_BUDGET = int(os.getenv("DOCUMENT_TOKEN_BUDGET", "12000"))
+
+# Worker processes extracting PDF pages (0 or 1 extracts in the request thread)
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# How the workers are started; not "fork", which can copy a lock held by another thread of the server
+PDF_EXTRACT_START_METHOD = os.getenv("PDF_EXTRACT_START_METHOD", "forkserver")
+
+# Pages handed to a worker at a time; documents up to this size are extracted in-process.
+# About PDF_EXTRACT_WORKERS batches are queued at once, so stopping early skips the rest.
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+
+# Bytes above which a PDF is copied to a temporary file the workers read, instead of being sent to them
+PDF_SPOOL_THRESHOLD = int(os.getenv("PDF_SPOOL_THRESHOLD", str(4 * 1024 * 1024)))
+
+# Data rows of each spreadsheet sheet included in the preview
+EXCEL_PREVIEW_ROWS = int(os.getenv("EXCEL_PREVIEW_ROWS", "10"))
+
+# Extracted texts kept per uploaded document (least recently used are evicted first)
+DOCUMENT_CACHE_SIZE = int(os.getenv("DOCUMENT_CACHE_SIZE", "64"))
+
+# Seconds an extracted text stays cached
+DOCUMENT_CACHE_TTL = int(os.getenv("DOCUMENT_CACHE_TTL", "86400"))
+
+# Extracted document text by content hash; entries are a one-item list holding the text
+extracted_text_cache = ResponseCache(DOCUMENT_CACHE_SIZE, DOCUMENT_CACHE_TTL)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            context = multiprocessing.get_context(PDF_EXTRACT_START_METHOD)
+            if PDF_EXTRACT_START_METHOD == "forkserver":
+                # The fork server loads this module only, not the application's __main__
+                context.set_forkserver_preload([__name__])
+            _executor = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS, mp_context=context)
+        return _executor
+
+
+def _open_source(source):
+    return source if isinstance(source, str) else io.BytesIO(source)
+
+
+def _extract_pages(source, page_numbers):
+    """
+    Extract the text of some pages of a PDF (runs in a worker process).
+
+    Pages are read with pdfplumber; a page it fails on is read again with PyPDF2.
+
+    Args:
+        source (bytes or str): Content of the PDF file, or the path of a copy on disk
+        page_numbers (list): 0-based numbers of the pages to extract
+
+    Returns:
+        list: The text of each page, in page_numbers order
+    """
+    import PyPDF2
+    import pdfplumber
+
+    try:
+        pdf = pdfplumber.open(_open_source(source))
+    except Exception as e:
+        print(f"WARNING: pdfplumber could not open the document, using PyPDF2: {str(e)}")
+        pdf = None
+
+    texts = []
+    fallback_reader = None
+    try:
+        for page_number in page_numbers:
+            try:
+                if pdf is None:
+                    raise ValueError("pdfplumber unavailable")
+                texts.append(pdf.pages[page_number].extract_text() or "")
+            except Exception as e:
+                if pdf is not None:
+                    print(f"WARNING: pdfplumber failed on page {page_number + 1}, using PyPDF2: {str(e)}")
+                try:
+                    if fallback_reader is None:
+                        fallback_reader = PyPDF2.PdfReader(_open_source(source))
+                    texts.append(fallback_reader.pages[page_number].extract_text() or "")
+                except Exception as e:
+                    print(f"WARNING: Could not extract page {page_number + 1}: {str(e)}")
+                    texts.append("")
+    finally:
+        if pdf is not None:
+            pdf.close()
+    return texts
+
+
+def _page_count(stream):
+    """Number of pages of a PDF, read with pdfplumber (PyPDF2 if pdfplumber cannot open the file)."""
+    import pdfplumber
+
+    stream.seek(0)
+    try:
+        pdf = pdfplumber.open(stream)
+    except Exception as e:
+        print(f"WARNING: pdfplumber could not open the document, counting pages with PyPDF2: {str(e)}")
+        import PyPDF2
+        stream.seek(0)
+        return len(PyPDF2.PdfReader(stream).pages)
+    try:
+        return len(pdf.pages)
+    finally:
+        pdf.close()
+
+
+def iter_pdf_pages(stream, max_pages=None):
+    """
+    Yield the text of each page of a PDF, in order.
+
+    Pages are extracted in parallel on the process pool, in batches of
+    PDF_PAGES_PER_TASK pages, while earlier pages are being consumed. Only
+    about PDF_EXTRACT_WORKERS batches are submitted at a time, the next one
+    as each is consumed, so closing the generator early (e.g. once a token
+    budget is reached) skips the batches not yet submitted. A PDF larger
+    than PDF_SPOOL_THRESHOLD is copied to a temporary file once, which the
+    workers read and which is removed on close; a smaller one is sent along
+    with each batch.
+
+    Args:
+        stream: Binary file object holding the PDF (e.g. an upload's stream)
+        max_pages (int): Pages to read at most (defaults to DOCUMENT_MAX_PAGES)
+
+    Yields:
+        tuple: (page_number, page_count, text), page_number starting at 1
+    """
+    page_count = _page_count(stream)
+    pages = list(range(min(page_count, max_pages or DOCUMENT_MAX_PAGES)))
+    batches = [pages[i:i + PDF_PAGES_PER_TASK] for i in range(0, len(pages), PDF_PAGES_PER_TASK)]
+
+    if PDF_EXTRACT_WORKERS <= 1 or len(batches) <= 1:
+        stream.seek(0)
+        data = stream.read()
+        for batch in batches:
+            for page_number, text in zip(batch, _extract_pages(data, batch)):
+                yield page_number + 1, page_count, text
+        return
+
+    size = stream.seek(0, os.SEEK_END)
+    stream.seek(0)
+    spool_path = None
+    if size > PDF_SPOOL_THRESHOLD:
+        with tempfile.NamedTemporaryFile(prefix="upload-", suffix=".pdf", delete=False) as spooled:
+            shutil.copyfileobj(stream, spooled)
+        source = spool_path = spooled.name
+    else:
+        source = stream.read()
+
+    pending = deque()
+    try:
+        executor = _get_executor()
+        queued = iter(batches)
+        for batch in queued:
+            pending.append((batch, executor.submit(_extract_pages, source, batch)))
+            if len(pending) == PDF_EXTRACT_WORKERS:
+                break
+        while pending:
+            batch, future = pending.popleft()
+            for page_number, text in zip(batch, future.result()):
+                yield page_number + 1, page_count, text
+            next_batch = next(queued, None)
+            if next_batch is not None:
+                pending.append((next_batch, executor.submit(_extract_pages, source, next_batch)))
+    finally:
+        for _, future in pending:
+            future.cancel()
+        if spool_path is not None:
+            # A batch that already opened the file finishes reading it; results not yet consumed are discarded
+            os.remove(spool_path)
+
+
+def collect_pages(pages, token_budget=None):
+    """
+    Join streamed page texts until the token budget is reached.
+
+    Args:
+        pages (iterable): (page_number, page_count, text) tuples, e.g. from iter_pdf_pages()
+        token_budget (int): Tokens to collect at most (defaults to DOCUMENT_TOKEN_BUDGET)
+
+    Returns:
+        str: The collected text, with a note when pages were left out
+    """
+    from prompts import count_tokens
+
+    token_budget = token_budget or DOCUMENT_TOKEN_BUDGET
+    parts = []
+    tokens = 0
+    page_number = page_count = 0
+    try:
+        for page_number, page_count, text in pages:
+            parts.append(text)
+            tokens += count_tokens(text)
+            if tokens >= token_budget:
+                break
+    finally:
+        if hasattr(pages, "close"):
+            pages.close()
+
+    if page_number < page_count:
+        print(f"Document text limited to {page_number} of {page_count} pages (~{tokens} tokens)")
+        parts.append(f"[Only the first {page_number} of {page_count} pages were included]")
+    return "\n".join(parts)
+
+
+def extract_pdf_text(stream):
+    """Text of a PDF (binary file object) for the documentation prompt, within DOCUMENT_MAX_PAGES and DOCUMENT_TOKEN_BUDGET."""
+    return collect_pages(iter_pdf_pages(stream))
+
+
+def extract_docx_text(stream):
+    """Paragraph text of a Word document, read from a binary file object."""
+    import docx
+
+    document = docx.Document(stream)
+    return "\n".join(paragraph.text for paragraph in document.paragraphs)
+
+
+def _format_sheet(sheet_name, headers, rows, total_rows):
+    """Describe one sheet: its headers, the preview rows ("header: value" pairs) and its row count."""
+    parts = [
+        f"Sheet: {sheet_name}",
+        "Column Headers: " + ", ".join(headers),
+        "Data Preview:"
+    ]
+    for index, row in enumerate(rows):
+        row_data = " | ".join(f"{header}: {value}" for header, value in zip(headers, row)
+                              if value is not None and value == value)  # skip empty cells and NaN
+        parts.append(f"Row {index}: {row_data}")
+    parts.append(f"Total Rows: {total_rows}")
+    parts.append("---")
+    return parts
+
+
+def _header_names(values):
+    return [str(value) if value is not None else f"Unnamed: {i}" for i, value in enumerate(values)]
+
+
+def extract_excel_text(stream, filename, preview_rows=None):
+    """
+    Describe every sheet of a spreadsheet without loading it into memory.
+
+    .xlsx files are opened read-only with openpyxl: only the header row and
+    the first preview_rows data rows are read, and the row count comes from
+    the sheet dimensions. Legacy .xls files are read with pandas, limited to
+    the preview rows (their row count is not available without a full read).
+
+    Args:
+        stream: Binary file object of the upload
+        filename (str): Name of the uploaded file
+        preview_rows (int): Data rows per sheet (defaults to EXCEL_PREVIEW_ROWS)
+
+    Returns:
+        str: Sheet name, column headers, preview rows and row count of each sheet
+    """
+    preview_rows = preview_rows or EXCEL_PREVIEW_ROWS
+    parts = []
+
+    if filename.endswith('.xls'):
+        import pandas as pd
+        for sheet_name, df in pd.read_excel(stream, sheet_name=None, nrows=preview_rows).items():
+            rows = [list(row) for row in df.itertuples(index=False)]
+            parts += _format_sheet(sheet_name, [str(column) for column in df.columns], rows, "unknown")
+        return "\n".join(parts)
+
+    import openpyxl
+    workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(max_row=preview_rows + 1, values_only=True)
+            headers = _header_names(next(rows, ()))
+            preview = [row for row in rows if any(value is not None for value in row)]
+
+            total_rows = sheet.max_row
+            if total_rows is None:
+                # No stored dimensions: count rows while streaming them
+                total_rows = sum(1 for _ in sheet.iter_rows(values_only=True))
+            parts += _format_sheet(sheet.title, headers, preview, max(total_rows - 1, 0))
+    finally:
+        workbook.close()
+    return "\n".join(parts)
+
+
+def document_digest(stream):
+    """SHA-256 hex digest of an uploaded file, read in blocks; the stream is rewound afterwards."""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for block in iter(lambda: stream.read(1024 * 1024), b""):
+        digest.update(block)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def extracted_text_key(digest, filename):
+    """Cache key of a document's extracted text; extraction limits are part of it since they change the text."""
+    extension = filename.rsplit('.', 1)[-1].lower()
+    return ResponseCache.make_key(
+        "document_text", digest, extension, DOCUMENT_MAX_PAGES, DOCUMENT_TOKEN_BUDGET, EXCEL_PREVIEW_ROWS)
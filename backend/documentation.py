@@ -1,24 +1,14 @@
 from flask import Blueprint, request, jsonify, Response
 import json
-from openai import AzureOpenAI
 import os
 from dotenv import load_dotenv
+from llm_streaming import stream_chat_completion
 
 load_dotenv()
 
-# Load Azure OpenAI credentials from .env
-azure_openai_key = os.getenv("AZURE_OPENAI_KEY")
-azure_openai_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-azure_openai_api_version = os.getenv("AZURE_OPENAI_API_VERSION")
+# Azure OpenAI deployment; the client itself is created on first use (llm_clients)
 azure_openai_deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT")
 
-# Initialize Azure OpenAI client
-client = AzureOpenAI(
-    api_key=azure_openai_key,
-    api_version=azure_openai_api_version,
-    azure_endpoint=azure_openai_endpoint
-)
-
 documentation_bp = Blueprint('documentation', __name__)
 
 @documentation_bp.route("/generate-narrative", methods=['POST'])
@@ -34,9 +24,9 @@ def generate_narrative():
 
         def generate_stream():
             try:
-                completion = client.chat.completions.create(
-                    model=azure_openai_deployment,
-                    messages=[
+                for content in stream_chat_completion(
+                    azure_openai_deployment,
+                    [
                         {
                             "role": "system",
                             "content": """You are an AI assistant that generates structured, professional narratives for BMC Control-M workflows.
@@ -78,19 +68,13 @@ def generate_narrative():
                             
                             Follow the exact structure provided, with clear section headers."""
                         }
-                    ],
-                    stream=True
-                )
-
-                for chunk in completion:
-                    if chunk.choices and hasattr(chunk.choices[0], "delta"):
-                        content = getattr(chunk.choices[0].delta, "content", None)
-                        if content:
-                            yield content
+                    ]
+                ):
+                    yield content
             except Exception as e:
                 yield json.dumps({"error": str(e)})
 
-        return Response(generate_stream(), content_type="text/plain")
+        return Response(generate_stream(), content_type="text/plain", headers={"X-Accel-Buffering": "no"})
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -109,9 +93,9 @@ def generate_talktrack():
 
         def generate_stream():
             try:
-                completion = client.chat.completions.create(
-                    model=azure_openai_deployment,
-                    messages=[
+                for content in stream_chat_completion(
+                    azure_openai_deployment,
+                    [
                         {
                             "role": "system",
                             "content": """You are an AI assistant that generates presentation-style talk tracks for BMC Control-M workflow demonstrations.
@@ -157,19 +141,13 @@ def generate_talktrack():
                             
                             Follow the exact structure provided, with clear section headers and timing guidance."""
                         }
-                    ],
-                    stream=True
-                )
-
-                for chunk in completion:
-                    if chunk.choices and hasattr(chunk.choices[0], "delta"):
-                        content = getattr(chunk.choices[0].delta, "content", None)
-                        if content:
-                            yield content
+                    ]
+                ):
+                    yield content
             except Exception as e:
                 yield json.dumps({"error": str(e)})
 
-        return Response(generate_stream(), content_type="text/plain")
+        return Response(generate_stream(), content_type="text/plain", headers={"X-Accel-Buffering": "no"})
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500 
\ No newline at end of file
@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from ctm_python_client.core.workflow import *
+from ctm_python_client.core.comm import *
+from clients.ctm_saas_client.rest import RESTClientObject
+from my_secrets import my_secrets
+
+# Environment keys that have an endpoint/api_key pair in my_secrets
+VALID_ENVIRONMENTS = ['saas_dev', 'saas_preprod', 'saas_prod', 'vse_dev', 'vse_qa', 'vse_prod']
+
+# Seconds a cached environment is reused before its client is rebuilt (picks up rotated keys)
+ENVIRONMENT_TTL = int(os.getenv("CTM_ENVIRONMENT_TTL", "3600"))
+
+# Keep-alive connections kept open per Control-M endpoint
+CONNECTION_POOL_MAXSIZE = int(os.getenv("CTM_CONNECTION_POOL_MAXSIZE", "16"))
+
+_registry = {}
+_registry_lock = threading.Lock()
+_stats = {"created": 0, "hits": 0, "expired": 0, "rotated": 0}
+
+
+class PooledEnvironment:
+    """A Control-M Environment and the AAPI client shared by every workflow built against it."""
+
+    def __init__(self, environment):
+        self.key = environment
+        self.environment = Environment.create_saas(
+            endpoint=my_secrets[f'{environment}_endpoint'],
+            api_key=my_secrets[f'{environment}_api_key']
+        )
+
+        # One AAPI client per environment; its urllib3 pool keeps connections alive between requests
+        self.aapiclient = SaasAAPIClient(self.environment.endpoint, self.environment.credentials)
+        self.aapiclient.configuration.connection_pool_maxsize = CONNECTION_POOL_MAXSIZE
+        self.aapiclient.apiclient.rest_client = RESTClientObject(self.aapiclient.configuration)
+
+        self.created_at = time.time()
+        self.hits = 0
+
+    def is_expired(self, now=None):
+        return ENVIRONMENT_TTL > 0 and (now or time.time()) - self.created_at > ENVIRONMENT_TTL
+
+    def stats(self):
+        """Return reuse counters and the state of the underlying HTTP connection pools."""
+        pools = self.aapiclient.apiclient.rest_client.pool_manager.pools
+        connection_pools = [pools[key] for key in pools.keys()]
+        return {
+            "endpoint": self.environment.endpoint,
+            "age_seconds": round(time.time() - self.created_at, 1),
+            "hits": self.hits,
+            "pool_maxsize": CONNECTION_POOL_MAXSIZE,
+            "open_pools": len(connection_pools),
+            "connections_opened": sum(pool.num_connections for pool in connection_pools),
+            "requests_sent": sum(pool.num_requests for pool in connection_pools),
+            "idle_connections": sum(
+                1 for pool in connection_pools if pool.pool for conn in list(pool.pool.queue) if conn is not None
+            )
+        }
+
+
+class PooledWorkflow(Workflow):
+    """Workflow that reuses the pooled AAPI client of its environment instead of creating its own."""
+
+    def __init__(self, pooled_environment, defaults=None):
+        BaseWorkflow.__init__(self, defaults=defaults)
+        self.environment = pooled_environment.environment
+        self.aapiclient = pooled_environment.aapiclient
+
+
+def get_environment(environment):
+    """
+    Return the cached PooledEnvironment for an environment key, creating it when missing or expired.
+
+    Args:
+        environment (str): One of VALID_ENVIRONMENTS
+
+    Returns:
+        PooledEnvironment: The shared environment and AAPI client
+
+    Raises:
+        ValueError: If the environment key is unknown
+    """
+    if environment not in VALID_ENVIRONMENTS:
+        raise ValueError(f"Invalid environment. Must be one of: {VALID_ENVIRONMENTS}")
+
+    with _registry_lock:
+        pooled = _registry.get(environment)
+        if pooled is not None and pooled.is_expired():
+            _stats["expired"] += 1
+            pooled = None
+
+        if pooled is None:
+            pooled = PooledEnvironment(environment)
+            _registry[environment] = pooled
+            _stats["created"] += 1
+        else:
+            pooled.hits += 1
+            _stats["hits"] += 1
+
+        return pooled
+
+
+def rotate_environment(environment=None):
+    """Drop the cached client for one environment (or all of them) so the next request rebuilds it."""
+    with _registry_lock:
+        keys = [environment] if environment else list(_registry.keys())
+        for key in keys:
+            if _registry.pop(key, None) is not None:
+                _stats["rotated"] += 1
+
+
+def get_pool_stats():
+    """Return registry counters and per-environment connection pool statistics."""
+    with _registry_lock:
+        return {
+            **_stats,
+            "ttl_seconds": ENVIRONMENT_TTL,
+            "environments": {key: pooled.stats() for key, pooled in _registry.items()}
+        }
@@ -0,0 +1,435 @@
+import os
+import json
+import time
+import uuid
+import fcntl
+import random
+import threading
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+
+# Base URL of the GitHub REST API (point it at a local stand-in server for testing)
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+
+# Seconds to wait for the GitHub API to connect and to answer
+GITHUB_TIMEOUT = float(os.getenv("GITHUB_TIMEOUT", "30"))
+
+# Keep-alive connections kept open to the GitHub API
+GITHUB_POOL_MAXSIZE = int(os.getenv("GITHUB_POOL_MAXSIZE", "8"))
+
+# Times a commit is rebuilt when the branch moved while it was being created
+GITHUB_REF_UPDATE_ATTEMPTS = int(os.getenv("GITHUB_REF_UPDATE_ATTEMPTS", "3"))
+
+# Directory queued publishes are persisted to, so they survive a restart
+GITHUB_PUBLISH_SPOOL_DIR = os.getenv("GITHUB_PUBLISH_SPOOL_DIR", "github_publish")
+
+# Attempts per publish before it is marked failed
+GITHUB_PUBLISH_MAX_ATTEMPTS = int(os.getenv("GITHUB_PUBLISH_MAX_ATTEMPTS", "8"))
+
+# First retry delay in seconds; doubled on every further attempt up to GITHUB_PUBLISH_MAX_BACKOFF
+GITHUB_PUBLISH_BACKOFF = float(os.getenv("GITHUB_PUBLISH_BACKOFF", "2"))
+GITHUB_PUBLISH_MAX_BACKOFF = float(os.getenv("GITHUB_PUBLISH_MAX_BACKOFF", "300"))
+
+# Seconds a finished publish stays queryable
+GITHUB_PUBLISH_RECORD_TTL = int(os.getenv("GITHUB_PUBLISH_RECORD_TTL", "86400"))
+
+# Seconds between scans of the spool for unfinished publishes whose process went away
+GITHUB_PUBLISH_RESCAN_INTERVAL = float(os.getenv("GITHUB_PUBLISH_RESCAN_INTERVAL", "60"))
+
+FINISHED_STAGES = ('succeeded', 'failed')
+
+
+class GitHubUploadError(Exception):
+    """Raised when the GitHub API rejects or fails a request."""
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def _retry_after(response):
+    """Seconds GitHub asks clients to wait, from Retry-After or an exhausted rate limit; None if unspecified."""
+    retry_after = response.headers.get("Retry-After", "").strip()
+    if retry_after.isdigit():
+        return float(retry_after)
+    if retry_after:
+        # Retry-After may also be an HTTP date
+        try:
+            retry_at = parsedate_to_datetime(retry_after)
+            if retry_at.tzinfo is None:
+                retry_at = retry_at.replace(tzinfo=timezone.utc)
+            return max(retry_at.timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            pass
+    reset = response.headers.get("X-RateLimit-Reset", "")
+    if response.headers.get("X-RateLimit-Remaining") == "0" and reset.isdigit():
+        return max(float(reset) - time.time(), 0.0)
+    return None
+
+
+class GitHubUploader:
+    """
+    Commits a set of files to a GitHub branch in a single commit.
+
+    Uses the Git data API instead of the contents API: the files are written
+    into one new tree on top of the branch head, committed once and the branch
+    ref is moved to that commit. That is five requests whatever the number of
+    files, all over one pooled keep-alive session.
+    """
+
+    def __init__(self, token, owner, repo, branch="main", api_url=None):
+        self.owner = owner
+        self.repo = repo
+        self.branch = branch
+        self.api_url = (api_url or GITHUB_API_URL).rstrip("/")
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=GITHUB_POOL_MAXSIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github+json",
+        })
+        self._lock = threading.Lock()
+
+    def _request(self, method, path, payload=None):
+        url = f"{self.api_url}/repos/{self.owner}/{self.repo}/{path}"
+        try:
+            response = self.session.request(method, url, json=payload, timeout=GITHUB_TIMEOUT)
+        except requests.RequestException as e:
+            raise GitHubUploadError(f"GitHub request failed: {str(e)}") from e
+
+        if response.status_code not in (200, 201):
+            try:
+                message = response.json().get("message", "Unknown error")
+            except ValueError:
+                message = response.text or "Unknown error"
+            raise GitHubUploadError(
+                f"GitHub {method} {path} failed ({response.status_code}): {message}",
+                status_code=response.status_code,
+                retry_after=_retry_after(response)
+            )
+        return response.json()
+
+    def commit_files(self, files, message):
+        """
+        Commit files to the branch in one commit.
+
+        Args:
+            files (dict): Repository path -> text content
+            message (str): Commit message
+
+        Returns:
+            dict: commit (SHA of the commit holding the files), url (its HTML URL, None if no
+                  new commit was needed) and files (the paths committed)
+
+        Raises:
+            GitHubUploadError: If a request fails or the branch keeps moving
+        """
+        tree = [
+            {"path": path, "mode": "100644", "type": "blob", "content": content}
+            for path, content in files.items()
+        ]
+
+        # Uploads from this process are serialized so they do not race for the branch head
+        with self._lock:
+            attempts = max(GITHUB_REF_UPDATE_ATTEMPTS, 1)
+            for attempt in range(attempts):
+                head = self._request("GET", f"git/ref/heads/{self.branch}")["object"]["sha"]
+                base_tree = self._request("GET", f"git/commits/{head}")["tree"]["sha"]
+                new_tree = self._request("POST", "git/trees", {"base_tree": base_tree, "tree": tree})["sha"]
+                if new_tree == base_tree:
+                    # The branch already holds these files (e.g. a retried upload that had succeeded)
+                    return {"commit": head, "url": None, "files": list(files)}
+
+                commit = self._request("POST", "git/commits", {
+                    "message": message,
+                    "tree": new_tree,
+                    "parents": [head],
+                })
+
+                try:
+                    self._request("PATCH", f"git/refs/heads/{self.branch}", {"sha": commit["sha"]})
+                except GitHubUploadError as e:
+                    # 422: not a fast-forward, someone else pushed in between
+                    if e.status_code == 422 and attempt + 1 < attempts:
+                        print(f"WARNING: {self.branch} moved during upload, retrying: {str(e)}")
+                        continue
+                    raise
+
+                return {
+                    "commit": commit["sha"],
+                    "url": commit.get("html_url"),
+                    "files": list(files)
+                }
+
+
+def is_retryable(error):
+    """Network errors, 5xx, 429 and rate-limited 403 responses are worth retrying; other errors are final."""
+    if error.status_code is None or error.status_code >= 500 or error.status_code == 429:
+        return True
+    return error.status_code == 403 and error.retry_after is not None
+
+
+class PublishQueue:
+    """
+    Publishes file sets to GitHub from a background thread.
+
+    Each submission gets a publish id and a record with its stage
+    (queued -> publishing -> retrying -> succeeded/failed). Records, including
+    the files still to publish, are written to the spool directory on every
+    change, so publishes accepted before a restart are resumed by the next
+    process. A process runs a publish only while it holds the publish's lock
+    file (flock), which the kernel releases when the process exits: several
+    gunicorn workers, or the old and new workers of a reload, never run the
+    same publish, and one left unfinished by an exited worker is taken over
+    by the next spool scan. Failed attempts are retried with exponential backoff (with
+    jitter), waiting at least as long as GitHub's Retry-After or rate-limit
+    reset asks for. Publishes run one at a time, which keeps bursts under
+    GitHub's secondary rate limits.
+    """
+
+    def __init__(self, uploader, spool_dir):
+        self.uploader = uploader
+        self.spool_dir = spool_dir
+        self._records = {}
+        self._files = {}
+        self._due = {}  # publish_id -> time of its next attempt
+        self._claims = {}  # publish_id -> descriptor of its locked claim file
+        self._condition = threading.Condition()
+        self._recover()
+        self._worker = threading.Thread(target=self._publisher, name="github-publish", daemon=True)
+        self._worker.start()
+
+    def _path(self, publish_id):
+        return os.path.join(self.spool_dir, f"{publish_id}.json")
+
+    def _claim(self, publish_id):
+        """Lock a publish for this process; False if another live process holds it."""
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            fd = os.open(os.path.join(self.spool_dir, f"{publish_id}.lock"), os.O_CREAT | os.O_RDWR, 0o644)
+        except OSError as e:
+            print(f"WARNING: Failed to claim GitHub publish {publish_id}: {str(e)}")
+            return False
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._claims[publish_id] = fd
+        return True
+
+    def _release(self, publish_id):
+        """Drop the claim of a finished publish. Caller holds the lock and has persisted the final record."""
+        fd = self._claims.pop(publish_id, None)
+        if fd is None:
+            return
+        try:
+            os.remove(os.path.join(self.spool_dir, f"{publish_id}.lock"))
+        except OSError:
+            pass
+        os.close(fd)
+
+    def _read_spooled(self, publish_id):
+        try:
+            with open(self._path(publish_id), 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"WARNING: Skipping unreadable GitHub publish {publish_id}: {str(e)}")
+            return None
+
+    def _persist(self, publish_id):
+        """Write a record (and its files while it is pending) to the spool. Caller holds the lock."""
+        record = self._records[publish_id]
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            temp_path = f"{self._path(publish_id)}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump({"record": record, "files": self._files.get(publish_id)}, f)
+            os.replace(temp_path, self._path(publish_id))
+        except Exception as e:
+            print(f"WARNING: Failed to spool GitHub publish {publish_id}: {str(e)}")
+
+    def _recover(self):
+        """
+        Load spooled records this process does not know yet. Caller holds the lock (or is __init__).
+
+        Unfinished publishes are queued again if no other process holds their
+        claim; those that another process is running are left to it.
+        """
+        if not os.path.isdir(self.spool_dir):
+            return
+        resumed = 0
+        for name in os.listdir(self.spool_dir):
+            publish_id = name[:-len(".json")]
+            if not name.endswith(".json") or publish_id in self._records:
+                continue
+            spooled = self._read_spooled(publish_id)
+            if spooled is None:
+                continue
+            if spooled["record"]["stage"] not in FINISHED_STAGES and spooled.get("files"):
+                if not self._claim(publish_id):
+                    continue
+                # Read it again under the claim: the previous owner may have finished it meanwhile
+                spooled = self._read_spooled(publish_id)
+                if spooled is None or spooled["record"]["stage"] in FINISHED_STAGES or not spooled.get("files"):
+                    self._release(publish_id)
+                    if spooled is not None:
+                        self._records[publish_id] = spooled["record"]
+                    continue
+                self._files[publish_id] = spooled["files"]
+                self._due[publish_id] = spooled["record"].get("next_attempt_at") or time.time()
+                resumed += 1
+            self._records[publish_id] = spooled["record"]
+        if resumed:
+            print(f"Resuming {resumed} queued GitHub publishes")
+
+    def _update(self, publish_id, **changes):
+        """Apply changes to a record and persist it. Caller holds the lock."""
+        record = self._records[publish_id]
+        record.update(changes)
+        record["updated_at"] = time.time()
+        self._persist(publish_id)
+
+    def _prune(self, now):
+        expired = [
+            publish_id for publish_id, record in self._records.items()
+            if record["stage"] in FINISHED_STAGES and now - record["updated_at"] > GITHUB_PUBLISH_RECORD_TTL
+        ]
+        for publish_id in expired:
+            del self._records[publish_id]
+            try:
+                os.remove(self._path(publish_id))
+            except OSError:
+                pass
+
+    def submit(self, files, message, context=None):
+        """
+        Queue files for publishing in one commit and return the publish id.
+
+        Args:
+            files (dict): Repository path -> text content
+            message (str): Commit message
+            context (dict): Extra fields reported with the status (e.g. the user code)
+
+        Returns:
+            str: The publish id
+        """
+        now = time.time()
+        publish_id = uuid.uuid4().hex
+        with self._condition:
+            self._prune(now)
+            self._records[publish_id] = {
+                "publish_id": publish_id,
+                "stage": "queued",
+                "message": message,
+                "paths": list(files),
+                "context": context or {},
+                "attempts": 0,
+                "next_attempt_at": now,
+                "last_error": None,
+                "result": None,
+                "created_at": now,
+                "updated_at": now
+            }
+            self._files[publish_id] = dict(files)
+            self._due[publish_id] = now
+            self._claim(publish_id)
+            self._persist(publish_id)
+            self._condition.notify_all()
+        return publish_id
+
+    def _next_due(self):
+        """Id and wait time of the publish due first, oldest first among those due. Caller holds the lock."""
+        if not self._due:
+            return None, None
+        publish_id = min(self._due, key=lambda key: (self._due[key], self._records[key]["created_at"]))
+        return publish_id, self._due[publish_id] - time.time()
+
+    def _backoff(self, attempts, error):
+        delay = min(GITHUB_PUBLISH_BACKOFF * 2 ** (attempts - 1), GITHUB_PUBLISH_MAX_BACKOFF)
+        delay *= random.uniform(0.5, 1.0)
+        if error.retry_after is not None:
+            delay = max(delay, error.retry_after)
+        return delay
+
+    def _publisher(self):
+        scanned_at = time.time()
+        while True:
+            with self._condition:
+                publish_id, wait = self._next_due()
+                while publish_id is None or wait > 0:
+                    until_scan = scanned_at + GITHUB_PUBLISH_RESCAN_INTERVAL - time.time()
+                    self._condition.wait(until_scan if publish_id is None else min(wait, until_scan))
+                    if time.time() >= scanned_at + GITHUB_PUBLISH_RESCAN_INTERVAL:
+                        self._recover()
+                        scanned_at = time.time()
+                    publish_id, wait = self._next_due()
+                del self._due[publish_id]
+                record = self._records[publish_id]
+                files = self._files[publish_id]
+                attempts = record["attempts"] + 1
+                self._update(publish_id, stage="publishing", attempts=attempts)
+
+            try:
+                result = self.uploader.commit_files(files, record["message"])
+            except GitHubUploadError as e:
+                with self._condition:
+                    if is_retryable(e) and attempts < GITHUB_PUBLISH_MAX_ATTEMPTS:
+                        delay = self._backoff(attempts, e)
+                        print(f"WARNING: GitHub publish {publish_id} attempt {attempts} failed, retrying in {delay:.0f}s: {str(e)}")
+                        self._due[publish_id] = time.time() + delay
+                        self._update(publish_id, stage="retrying", last_error=str(e), next_attempt_at=self._due[publish_id])
+                    else:
+                        print(f"GITHUB PUBLISH {publish_id} FAILED: {str(e)}")
+                        self._files.pop(publish_id, None)
+                        self._update(publish_id, stage="failed", last_error=str(e), next_attempt_at=None)
+                        self._release(publish_id)
+                continue
+            except Exception as e:
+                print(f"GITHUB PUBLISH {publish_id} FAILED: {str(e)}")
+                with self._condition:
+                    self._files.pop(publish_id, None)
+                    self._update(publish_id, stage="failed", last_error=str(e), next_attempt_at=None)
+                    self._release(publish_id)
+                continue
+
+            with self._condition:
+                self._files.pop(publish_id, None)
+                self._update(publish_id, stage="succeeded", result=result, next_attempt_at=None)
+                self._release(publish_id)
+
+    def status(self, publish_id):
+        """Return a copy of the publish record, or None if the id is unknown."""
+        with self._condition:
+            record = self._records.get(publish_id)
+            if record is not None:
+                return dict(record)
+
+        # Publishes submitted to another worker process are read from the spool
+        if not publish_id or not all(c in '0123456789abcdef' for c in publish_id):
+            return None
+        try:
+            with open(self._path(publish_id), 'r') as f:
+                return json.load(f)["record"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def stats(self):
+        with self._condition:
+            stages = {}
+            for record in self._records.values():
+                stages[record["stage"]] = stages.get(record["stage"], 0) + 1
+            publish_id, wait = self._next_due()
+            return {
+                "stages": stages,
+                "pending": len(self._due),
+                "next_attempt_in": round(max(wait, 0), 1) if publish_id else None,
+                "max_attempts": GITHUB_PUBLISH_MAX_ATTEMPTS,
+                "spool_dir": self.spool_dir
+            }
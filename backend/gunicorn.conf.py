@@ -0,0 +1,60 @@
+"""
+Production server settings: gunicorn app:app -c gunicorn.conf.py
+
+The default worker model is one gthread worker process with a large thread
+pool. Streaming endpoints (proposed_workflow, generate-narrative,
+generate-talktrack) hold a thread for the whole LLM stream, but those threads
+spend nearly all of it waiting on the network, so one process serves a few
+hundred concurrent streams. A single process is the default because the deploy
+queue, the LLM response caches and the similar use case index live in process
+memory: with several workers a deploy status poll can reach a worker that never
+saw the deploy. See "Backend in production" in the README for measured limits.
+"""
+import os
+
+# Address to listen on
+bind = os.getenv("WEB_BIND", "0.0.0.0:5000")
+
+# Worker processes; keep at 1 unless deploy status polling is routed back to the same worker
+workers = int(os.getenv("WEB_WORKERS", "1"))
+
+# gthread (threads per worker) or gevent (green threads; needs the gevent package)
+worker_class = os.getenv("WEB_WORKER_CLASS", "gthread")
+
+# Concurrent requests per gthread worker, streams included
+threads = int(os.getenv("WEB_THREADS", "256"))
+
+# Concurrent requests per gevent worker
+worker_connections = int(os.getenv("WEB_WORKER_CONNECTIONS", "1000"))
+
+# Pending connections queued by the kernel while all threads are busy
+backlog = int(os.getenv("WEB_BACKLOG", "2048"))
+
+# Seconds a worker may go without a heartbeat before it is restarted; gthread and
+# gevent workers keep beating while requests stream, so this does not cap stream length
+timeout = int(os.getenv("WEB_TIMEOUT", "120"))
+
+# Seconds in-flight requests (e.g. running streams) get to finish on shutdown or reload
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "90"))
+
+# Seconds an idle keep-alive connection is held open
+keepalive = int(os.getenv("WEB_KEEPALIVE", "5"))
+
+accesslog = os.getenv("WEB_ACCESS_LOG", "-")
+errorlog = "-"
+
+
+def worker_exit(server, worker):
+    """Write spooled artifacts and stop the PDF extraction pool before the worker goes away."""
+    try:
+        from artifacts import artifact_store
+        artifact_store.flush()
+    except Exception as e:
+        print(f"WARNING: Failed to flush workflow artifacts on shutdown: {str(e)}")
+
+    try:
+        import document_extraction
+        if document_extraction._executor is not None:
+            document_extraction._executor.shutdown(wait=False, cancel_futures=True)
+    except Exception as e:
+        print(f"WARNING: Failed to stop the PDF extraction pool on shutdown: {str(e)}")
@@ -1,7 +1,5 @@
 from flask import Blueprint, request, jsonify, Response
 import json
-import base64
-import requests
 import os
 from datetime import datetime
 from dotenv import load_dotenv
@@ -10,12 +8,18 @@ from ctm_python_client.core.credential import *
 from ctm_python_client.core.comm import *
 from aapi import *
 from my_secrets import *
-from job_library import JOB_LIBRARY
-import docx
-import PyPDF2
-import pdfplumber
-import time
-import pandas as pd
+from job_library import JOB_LIBRARY, find_job_by_object_name, catalog_version
+from artifacts import artifact_store
+from workflow_fragments import job_fragments
+from github_upload import GitHubUploader, PublishQueue, GITHUB_PUBLISH_SPOOL_DIR
+from prompts import documentation_messages
+from json_repair import parse_model_json, JSONRepairError, TruncatedJSONError
+from document_extraction import (
+    extract_pdf_text, extract_excel_text, extract_docx_text,
+    document_digest, extracted_text_key, extracted_text_cache
+)
+from llm_cache import ResponseCache, documentation_analysis_cache, normalize_use_case
+from llm_clients import get_openai_client
 import io
 
 load_dotenv()
@@ -31,47 +35,9 @@ BASE_FOLDER_PATH = "jobs"  # Folder where files will be uploaded
 
 importexport_bp = Blueprint('importexport', __name__)
 
-def connect_to_github(file_path, content, message):
-    """Uploads a file to GitHub repository using GitHub API."""
-    if not GITHUB_TOKEN:
-        return {"status": "error", "message": "GitHub token is not configured"}
-
-    url = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/contents/{file_path}"
-    
-    headers = {
-        "Authorization": f"token {GITHUB_TOKEN}",
-        "Content-Type": "application/json",
-    }
-
-    try:
-        # Get the SHA if the file exists (needed for updates)
-        response = requests.get(url, headers=headers)
-        if response.status_code == 404:
-            # File doesn't exist yet, that's okay
-            sha = None
-        elif response.status_code != 200:
-            error_msg = response.json().get("message", "Unknown error")
-            return {"status": "error", "message": f"Error checking file existence: {error_msg}"}
-        else:
-            sha = response.json().get("sha")
-
-        data = {
-            "message": message,
-            "content": base64.b64encode(content.encode()).decode(),
-            "branch": BRANCH,
-        }
-        if sha:
-            data["sha"] = sha  # Required for updates
-
-        upload_response = requests.put(url, headers=headers, data=json.dumps(data))
-        
-        if upload_response.status_code in [200, 201]:
-            return {"status": "success", "file": file_path}
-        else:
-            error_msg = upload_response.json().get("message", "Unknown error")
-            return {"status": "error", "message": f"Error uploading file: {error_msg}"}
-    except Exception as e:
-        return {"status": "error", "message": f"Exception during upload: {str(e)}"}
+# Uploads go through one pooled session to the GitHub API, published from a background queue
+github_uploader = GitHubUploader(GITHUB_TOKEN, REPO_OWNER, REPO_NAME, BRANCH)
+publish_queue = PublishQueue(github_uploader, GITHUB_PUBLISH_SPOOL_DIR)
 
 
 @importexport_bp.route('/download_workflow', methods=['POST'])
@@ -108,38 +74,20 @@ def download_workflow():
     formatted_application = f"{user_code}-demo-genai"
     formatted_sub_application = f"{user_code}-demo-genai"
 
-    # ENV & defaults
-    my_env = Environment.create_saas(
-        endpoint=my_secrets[f'{environment}_endpoint'],
-        api_key=my_secrets[f'{environment}_api_key']
-    )
+    for job_key in requested_jobs:
+        if job_key not in JOB_LIBRARY:
+            return jsonify({"error": f"Unknown job: {job_key}"}), 400
 
-    defaults = WorkflowDefaults(
+    # Chained jobs are spliced from their pre-serialized fragments
+    raw_json, _ = job_fragments.chain_workflow_json(
+        requested_jobs, formatted_folder_name,
+        site_standard="lba_DemoGen AI",
+        controlm_server=controlm_server,
         run_as="ctmagent",
         host="demogenai",
         application=formatted_application,
         sub_application=formatted_sub_application
     )
-
-    workflow = Workflow(my_env, defaults=defaults)
-    folder = Folder(formatted_folder_name, site_standard="lba_DemoGen AI", controlm_server=controlm_server)
-    workflow.add(folder)
-
-    job_paths = []
-
-    for job_key in requested_jobs:
-        if job_key not in JOB_LIBRARY:
-            return jsonify({"error": f"Unknown job: {job_key}"}), 400
-
-        job = JOB_LIBRARY[job_key]()
-        workflow.add(job, inpath=formatted_folder_name)
-        job_paths.append(f"{formatted_folder_name}/{job.object_name}")
-
-    #Chaining jobs
-    for i in range(len(job_paths) - 1):
-        workflow.connect(job_paths[i], job_paths[i + 1])
-
-    raw_json = workflow.dumps_json()
     
     # Return the JSON with appropriate headers for download
     return Response(
@@ -183,22 +131,11 @@ def upload_workflow():
         # Get all keys that start with 'zzt-'
         object_names = [key for key in workflow_data[folder_name].keys() if key.startswith('zzt-')]
 
-        # Validate each object name against JOB_LIBRARY
+        # Validate each object name against JOB_LIBRARY using the cached reverse index
         for obj_name in object_names:
-            # Remove the 'zzt-' prefix to get the base name
-            base_name = obj_name[4:]  # Remove 'zzt-' prefix
-            
-            # Find matching job in JOB_LIBRARY
-            found_job = None
-            for job_name, job_class in JOB_LIBRARY.items():
-                # Create an instance of the job to check its object_name
-                job_instance = job_class()
-                if job_instance.object_name == obj_name:
-                    found_job = job_name
-                    break
-            
+            found_job = find_job_by_object_name(obj_name)
             if found_job:
-                jobs.append(found_job)
+                jobs.append(found_job["key"])
 
         if not jobs:
             return jsonify({"error": "No valid jobs found in the workflow"}), 400
@@ -213,9 +150,28 @@ def upload_workflow():
         return jsonify({"error": str(e)}), 500
 
 
+@importexport_bp.route('/workflow/<workflow_id>', methods=['GET'])
+def get_workflow_artifact(workflow_id):
+    """Return a previously generated workflow JSON by its workflow id."""
+    workflow_json = artifact_store.get(workflow_id)
+    if workflow_json is None:
+        return jsonify({"error": f"Workflow not found: {workflow_id}"}), 404
+
+    return Response(
+        workflow_json,
+        mimetype='application/json',
+        headers={'Content-Disposition': f'attachment; filename=workflow_{workflow_id}.json'}
+    )
+
+
 @importexport_bp.route("/upload-github", methods=["POST"])
 def upload_github():
-    """Endpoint to upload workflow and narrative files to GitHub."""
+    """
+    Queue the workflow, narrative and metadata files for publishing to GitHub.
+
+    Returns 202 with the publish id and status URL right away; the commit is
+    made in the background and retried on transient GitHub errors.
+    """
     try:
         if not GITHUB_TOKEN:
             return jsonify({"error": "GitHub token is not configured"}), 500
@@ -223,16 +179,18 @@ def upload_github():
         data = request.json
         narrative_text = data.get("narrative_text", "")
         user_code = data.get("user_info", "unknown_user")
+        workflow_id = data.get("workflow_id")
+
+        if not workflow_id:
+            return jsonify({"error": "Missing workflow_id"}), 400
 
         if not narrative_text:
             return jsonify({"error": "Missing narrative"}), 400
 
-        # Read the output.json file
-        try:
-            with open("output.json", "r") as f:
-                workflow_json = f.read()
-        except Exception as e:
-            return jsonify({"error": f"Failed to read output.json: {str(e)}"}), 500
+        # Fetch the generated workflow from the artifact store
+        workflow_json = artifact_store.get(workflow_id)
+        if workflow_json is None:
+            return jsonify({"error": f"Workflow not found: {workflow_id}"}), 404
 
         # Generate a unique folder name (Timestamp format: YYYY-MM-DD_HH-MM-SS)
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
@@ -243,26 +201,33 @@ def upload_github():
         narrative_file = f"{folder_name}/{user_code}_narrative.txt"
         metadata_file = f"{folder_name}/{user_code}_metadata.txt"
 
-        # Upload both files
-        upload_workflow = connect_to_github(workflow_file, workflow_json, "Added workflow JSON")
-        if upload_workflow["status"] == "error":
-            return jsonify({"error": upload_workflow["message"]}), 500
-
-        upload_narrative = connect_to_github(narrative_file, narrative_text, "Added workflow narrative")
-        if upload_narrative["status"] == "error":
-            return jsonify({"error": upload_narrative["message"]}), 500
-
-        # Optional: Upload metadata (user info, timestamp, etc.)
+        # Workflow, narrative and metadata go into a single commit
         metadata_content = f"Upload Time: {timestamp}\nUser Code: {user_code}"
-        upload_metadata = connect_to_github(metadata_file, metadata_content, "Added metadata")
-        if upload_metadata["status"] == "error":
-            return jsonify({"error": upload_metadata["message"]}), 500
+        publish_id = publish_queue.submit({
+            workflow_file: workflow_json,
+            narrative_file: narrative_text,
+            metadata_file: metadata_content
+        }, f"Added workflow, narrative and metadata for {user_code}", {"user_code": user_code, "folder": folder_name})
 
         return jsonify({
-            "workflow": upload_workflow,
-            "narrative": upload_narrative,
-            "metadata": upload_metadata
-        }), 200
+            "message": "Upload queued",
+            "publish_id": publish_id,
+            "stage": "queued",
+            "status_url": f"/importexport/upload-github/{publish_id}",
+            "files": [workflow_file, narrative_file, metadata_file]
+        }), 202
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@importexport_bp.route("/upload-github/<publish_id>", methods=["GET"])
+def upload_github_status(publish_id):
+    """Stage, attempts, last error and resulting commit of a queued GitHub upload."""
+    try:
+        record = publish_queue.status(publish_id)
+        if record is None:
+            return jsonify({"error": "Upload not found"}), 404
+        return jsonify(record), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -282,71 +247,38 @@ def analyze_documentation():
         if not file.filename.endswith(('.txt', '.doc', '.docx', '.pdf', '.xlsx', '.xls')):
             return jsonify({"error": "Invalid file format. Please upload .txt, .doc, .docx, .pdf, .xlsx, or .xls files"}), 400
 
+        # Identical uploads reuse the text extracted the first time
+        document_hash = document_digest(file.stream)
+        text_key = extracted_text_key(document_hash, file.filename)
+        cached_text = extracted_text_cache.get(text_key)
+
         # Read file content based on file type
-        file_content = ""
-        try:
-            if file.filename.endswith('.txt'):
-                file_content = file.read().decode('utf-8')
-            elif file.filename.endswith(('.doc', '.docx')):
-                # Save the file temporarily
-                temp_path = f"temp_{int(time.time())}.docx"
-                file.save(temp_path)
-                
-                # Read the Word document
-                doc = docx.Document(temp_path)
-                file_content = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-                
-                # Clean up temporary file
-                os.remove(temp_path)
-                
-            elif file.filename.endswith('.pdf'):
-                # Save the file temporarily
-                temp_path = f"temp_{int(time.time())}.pdf"
-                file.save(temp_path)
-                
-                # Try using pdfplumber first (better for text extraction)
-                try:
-                    with pdfplumber.open(temp_path) as pdf:
-                        file_content = "\n".join([page.extract_text() for page in pdf.pages])
-                except Exception as e:
-                    # Fallback to PyPDF2
-                    with open(temp_path, 'rb') as pdf_file:
-                        pdf_reader = PyPDF2.PdfReader(pdf_file)
-                        file_content = "\n".join([page.extract_text() for page in pdf_reader.pages])
+        if cached_text is not None:
+            file_content = cached_text[0]
+        else:
+            file_content = ""
+            try:
+                if file.filename.endswith('.txt'):
+                    file_content = file.read().decode('utf-8')
+                elif file.filename.endswith(('.doc', '.docx')):
+                    # Read the Word document straight from the upload stream
+                    file_content = extract_docx_text(file.stream)
                 
-                # Clean up temporary file
-                os.remove(temp_path)
+                elif file.filename.endswith('.pdf'):
+                    # Extract pages in parallel (pdfplumber, PyPDF2 per failed page) up to the page cap and token budget
+                    file_content = extract_pdf_text(file.stream)
                 
-            elif file.filename.endswith(('.xlsx', '.xls')):
-                # Read Excel file
-                try:
-                    # Read all sheets from the Excel file
-                    excel_data = pd.read_excel(file, sheet_name=None)
-                    
-                    # Combine all sheet data into a single text representation
-                    excel_content_parts = []
-                    
-                    for sheet_name, df in excel_data.items():
-                        excel_content_parts.append(f"Sheet: {sheet_name}")
-                        excel_content_parts.append("Column Headers: " + ", ".join(df.columns.tolist()))
-                        excel_content_parts.append("Data Preview:")
-                        
-                        # Get first 10 rows as preview
-                        preview_rows = df.head(10)
-                        for index, row in preview_rows.iterrows():
-                            row_data = " | ".join([f"{col}: {val}" for col, val in row.items() if pd.notna(val)])
-                            excel_content_parts.append(f"Row {index}: {row_data}")
-                        
-                        excel_content_parts.append(f"Total Rows: {len(df)}")
-                        excel_content_parts.append("---")
-                    
-                    file_content = "\n".join(excel_content_parts)
-                    
-                except Exception as e:
-                    return jsonify({"error": f"Error reading Excel file: {str(e)}"}), 500
+                elif file.filename.endswith(('.xlsx', '.xls')):
+                    # Read headers, preview rows and row counts without loading the sheets
+                    try:
+                        file_content = extract_excel_text(file.stream, file.filename)
+                    except Exception as e:
+                        return jsonify({"error": f"Error reading Excel file: {str(e)}"}), 500
                 
-        except Exception as e:
-            return jsonify({"error": f"Error reading file: {str(e)}"}), 500
+            except Exception as e:
+                return jsonify({"error": f"Error reading file: {str(e)}"}), 500
+
+            extracted_text_cache.put(text_key, [file_content])
 
         if not file_content.strip():
             return jsonify({"error": "No readable content found in the file"}), 400
@@ -354,97 +286,32 @@ def analyze_documentation():
         # Get list of available technologies from JOB_LIBRARY
         available_technologies = list(JOB_LIBRARY.keys())
         
-        # Import OpenAI client here to avoid circular imports
-        from openai import AzureOpenAI
-        import os
-        from dotenv import load_dotenv
-        
-        load_dotenv()
-        
-        # Load Azure OpenAI credentials from .env
-        azure_openai_key = os.getenv("AZURE_OPENAI_KEY")
-        azure_openai_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-        azure_openai_api_version = os.getenv("AZURE_OPENAI_API_VERSION")
         azure_openai_deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT")
 
-        # Initialize Azure OpenAI client
-        client = AzureOpenAI(
-            api_key=azure_openai_key,
-            api_version=azure_openai_api_version,
-            azure_endpoint=azure_openai_endpoint
-        )
-        
-        completion = client.chat.completions.create(
+        # The same document and use case against the same catalog get the earlier analysis
+        analysis_key = ResponseCache.make_key(
+            "analyze_documentation", azure_openai_deployment, catalog_version(), text_key, normalize_use_case(use_case))
+        cached_analysis = documentation_analysis_cache.get(analysis_key)
+        if cached_analysis is not None:
+            return jsonify(json.loads(cached_analysis[0])), 200, {"X-Cache": "HIT"}
+
+        completion = get_openai_client().chat.completions.create(
             model=azure_openai_deployment,
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"""You are an AI assistant that analyzes documentation to extract workflow requirements and technologies.
-                    Your response must be in JSON format with this structure:
-                    {{
-                        "extracted_use_case": "Detailed use case extracted from documentation",
-                        "suggested_technologies": ["Technology1", "Technology2", "Technology3", "Technology4", "Technology5", "Technology6", "Technology7", "Technology8", "Technology9", "Technology10"],
-                        "workflow_order": ["Technology1", "Technology2", "Technology3", "Technology4", "Technology5", "Technology6", "Technology7", "Technology8", "Technology9", "Technology10"],
-                        "analysis_summary": "Brief summary of the analysis",
-                        "technologies_for_manual_workflow": ["Technology1", "Technology2", "Technology3", "Technology4", "Technology5", "Technology6", "Technology7", "Technology8", "Technology9", "Technology10"]
-                    }}
-                    
-                    CRITICAL REQUIREMENTS:
-                    1. You MUST suggest AT LEAST 10 technologies from this exact list: {available_technologies}
-                    2. Do NOT suggest technologies that are not in the provided list
-                    3. Extract the most relevant use case details from the documentation
-                    4. Consider both the provided use case and the documentation content
-                    5. Suggest technologies that best match the requirements and create a comprehensive workflow
-                    6. Provide a logical workflow order based on dependencies
-                    7. The "technologies_for_manual_workflow" field should contain the same technologies as "suggested_technologies" - this is for direct input to the manual workflow generation
-                    8. For Excel files, analyze the data structure, column headers, and data patterns to understand the workflow requirements
-                    9. If the documentation doesn't clearly indicate 10 technologies, select additional relevant technologies from the list to create a comprehensive workflow
-                    10. Ensure the workflow covers data ingestion, processing, storage, analysis, and reporting phases
-                    11. Return ONLY the JSON object, no additional text
-                    
-                    TECHNOLOGY SELECTION STRATEGY:
-                    - Always include data processing technologies (AWS_Glue, Azure_Databricks, GCP_Dataflow, etc.)
-                    - Include database/storage technologies (AWS_Redshift, Azure_Synapse, GCP_BigQuery, etc.)
-                    - Include orchestration technologies (AWS_StepFunctions, GCP_Workflows, etc.)
-                    - Include monitoring/notification technologies (AWS_SNS, AWS_SQS, etc.)
-                    - Include compute technologies (AWS_EC2, Azure_VM, GCP_VM, etc.)
-                    - Include serverless technologies (AWS_Lambda, Azure_Functions, etc.)
-                    - Include integration technologies (AWS_AppFlow, Azure_LogicApps, etc.)
-                    - Include backup/security technologies (AWS_Backup, etc.)
-                    - Include analytics/BI technologies (AWS_QuickSight, MS_PowerBI, Tableau, etc.)
-                    - Include DevOps technologies (AZURE_DevOps, Jenkins, etc.)"""
-                },
-                {
-                    "role": "user",
-                    "content": f"""Analyze this documentation and use case to extract workflow requirements and suggest technologies:
-                    
-                    Documentation Content:
-                    {file_content}
-                    
-                    Additional Use Case Context:
-                    {use_case}
-                    
-                    File Type: {file.filename.split('.')[-1].upper()}
-                    
-                    CRITICAL REQUIREMENTS:
-                    - You MUST suggest AT LEAST 10 technologies from this list: {available_technologies}
-                    - Do NOT suggest technologies outside this list
-                    - Create a comprehensive workflow that covers multiple phases (ingestion, processing, storage, analysis, reporting)
-                    - If the documentation doesn't clearly indicate 10 technologies, select additional relevant technologies to create a complete workflow
-                    
-                    Return ONLY a JSON object with the extracted use case, suggested technologies (minimum 10), workflow order, analysis summary, and technologies_for_manual_workflow array."""
-                }
-            ]
+            messages=documentation_messages(file_content, use_case, file.filename.split('.')[-1].upper())
         )
 
         response_content = completion.choices[0].message.content.strip()
         
         try:
-            # Extract JSON from response
-            start = response_content.find('{')
-            end = response_content.rfind('}') + 1
-            json_str = response_content[start:end]
-            analysis_result = json.loads(json_str)
+            # Extract JSON from response, repairing small defects instead of failing; a cut-off
+            # response keeps its complete fields, and the technology lists are padded below
+            repairs = []
+            analysis_result = parse_model_json(response_content, "analyze_documentation", allow_truncated=True, repairs=repairs)
+            if "truncated" in repairs:
+                if not isinstance(analysis_result, dict) or not isinstance(analysis_result.get('suggested_technologies'), list):
+                    raise TruncatedJSONError("Analysis was cut off before its suggested technologies")
+                analysis_result.setdefault('workflow_order', list(analysis_result['suggested_technologies']))
+                analysis_result.setdefault('analysis_summary', "")
             
             # Verify that all suggested technologies are valid
             valid_technologies = [tech for tech in analysis_result['suggested_technologies'] 
@@ -538,10 +405,14 @@ def analyze_documentation():
                 valid_manual_technologies = [tech for tech in analysis_result['technologies_for_manual_workflow'] 
                                            if tech in available_technologies]
                 analysis_result['technologies_for_manual_workflow'] = valid_manual_technologies
+
+            # A partial analysis is returned but not cached, so the next request asks again
+            if "truncated" not in repairs:
+                documentation_analysis_cache.put(analysis_key, [json.dumps(analysis_result)])
             
             return jsonify(analysis_result), 200
             
-        except json.JSONDecodeError as e:
+        except JSONRepairError as e:
             return jsonify({"error": "Failed to parse AI response"}), 500
 
     except Exception as e:
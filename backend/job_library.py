@@ -4,6 +4,9 @@ from ctm_python_client.core.credential import *
 from ctm_python_client.core.comm import *
 from aapi import *
 from my_secrets import my_secrets
+import copy
+import attrs
+import hashlib
 
     
 # Somewhere global in your module
@@ -750,4 +753,157 @@ JOB_LIBRARY = {
         url_parameters=[{"zip": "%%zipcode,fr"},{"appid": "%%appid"},{"units": "metric"}],
         output_handling=[{"HttpCode": "200","Parameter": "$.main.temp","Variable": "TEMPERATURE"},{"HttpCode": "200","Parameter": "$.name","Variable": "CITY"}]
     )
-            }
\ No newline at end of file
+            }
+
+
+def _library_fingerprint():
+    """Identify the current JOB_LIBRARY contents so derived indexes notice added/replaced entries."""
+    return tuple((key, id(factory)) for key, factory in JOB_LIBRARY.items())
+
+
+def catalog_version():
+    """Short hash of the JOB_LIBRARY keys (in order); changes whenever the catalog offered to the LLM changes."""
+    return hashlib.sha256("\n".join(JOB_LIBRARY.keys()).encode('utf-8')).hexdigest()[:16]
+
+
+# Prototype cache: library key -> (factory, job class, shared init kwargs, per-instance kwargs)
+_prototypes = {}
+
+# Fields that workflows append to (events, connections); every instance gets its own copy
+_PER_INSTANCE_FIELDS = {
+    'events_to_add', 'wait_for_events', 'events_to_delete',
+    'add_events_list', 'wait_for_events_list', 'delete_events_list'
+}
+
+
+class _FrozenDict(dict):
+    """Read-only dict for payloads shared by every instance built from a prototype."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Job library prototype payloads are shared and read-only")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (_FrozenDict, (dict(self),))
+
+
+def _freeze(value):
+    """Recursively turn dicts into _FrozenDict and lists into tuples."""
+    if isinstance(value, dict):
+        return _FrozenDict((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _build_prototype(key):
+    """Instantiate a library entry once and keep only the fields that differ from the class defaults."""
+    factory = JOB_LIBRARY[key]
+    job = factory()
+    job_class = type(job)
+    shared_kwargs = {}
+    per_instance_kwargs = {}
+
+    for field in attrs.fields(job_class):
+        if not field.init:
+            continue
+
+        value = getattr(job, field.name)
+        default = field.default
+        if isinstance(default, attrs.Factory):
+            default = default.factory() if not default.takes_self else attrs.NOTHING
+        if default is not attrs.NOTHING and value == default:
+            continue
+
+        if field.name in _PER_INSTANCE_FIELDS:
+            per_instance_kwargs[field.alias] = value
+        else:
+            shared_kwargs[field.alias] = _freeze(value)
+
+    return factory, job_class, shared_kwargs, per_instance_kwargs
+
+
+def create_job(key):
+    """
+    Return a new job for a JOB_LIBRARY key, built from a cached prototype.
+
+    The prototype is rebuilt whenever the entry's factory in JOB_LIBRARY is
+    replaced. New instances share its nested payloads (file transfers, variables,
+    output handling, ...) as frozen structures and only get fresh event lists,
+    the fields workflows mutate. Reassigning attributes such as object_name on
+    the instance is always safe.
+
+    Args:
+        key (str): JOB_LIBRARY key
+
+    Returns:
+        Job: A job instance equivalent to JOB_LIBRARY[key]()
+
+    Raises:
+        KeyError: If the key is not in JOB_LIBRARY
+    """
+    prototype = _prototypes.get(key)
+    if prototype is None or prototype[0] is not JOB_LIBRARY[key]:
+        prototype = _build_prototype(key)
+        _prototypes[key] = prototype
+
+    _, job_class, shared_kwargs, per_instance_kwargs = prototype
+    if per_instance_kwargs:
+        return job_class(**shared_kwargs, **copy.deepcopy(per_instance_kwargs))
+    return job_class(**shared_kwargs)
+
+
+# Reverse index: object_name -> {"key": JOB_LIBRARY key, "type": AAPI job Type}
+_object_name_index = None
+_object_name_index_fingerprint = None
+
+
+def invalidate_job_library_indexes():
+    """Drop every index and prototype derived from JOB_LIBRARY; they are rebuilt on next use."""
+    global _object_name_index, _object_name_index_fingerprint
+    _object_name_index = None
+    _object_name_index_fingerprint = None
+    _prototypes.clear()
+
+
+def get_object_name_index():
+    """
+    Return the cached object_name -> library entry index, building it on first use.
+
+    Each JOB_LIBRARY entry is instantiated once per library version. When several
+    entries share an object_name the first one in library order wins, matching a
+    linear scan of JOB_LIBRARY.
+
+    Returns:
+        dict: object_name -> {"key": library key, "type": job Type (e.g. "Job:AWS Glue")}
+    """
+    global _object_name_index, _object_name_index_fingerprint
+
+    fingerprint = _library_fingerprint()
+    if _object_name_index is not None and _object_name_index_fingerprint == fingerprint:
+        return _object_name_index
+
+    index = {}
+    for key in JOB_LIBRARY:
+        try:
+            job = create_job(key)
+        except Exception as e:
+            print(f"WARNING: Could not index job library entry {key}: {str(e)}")
+            continue
+        index.setdefault(job.object_name, {"key": key, "type": job._type})
+
+    _object_name_index = index
+    _object_name_index_fingerprint = fingerprint
+    return index
+
+
+def find_job_by_object_name(object_name):
+    """Return the {"key", "type"} library entry whose job has this object_name, or None."""
+    return get_object_name_index().get(object_name)
@@ -0,0 +1,273 @@
+import json
+import re
+import threading
+
+# Repairs applied by repair_json(), in the order they are reported
+REPAIR_KINDS = (
+    "surrounding_text",    # prose or markdown fences around the JSON
+    "comments",            # // and /* */ comments
+    "python_literals",     # True / False / None
+    "control_characters",  # raw newlines or tabs inside strings
+    "missing_comma",       # adjacent values without a separator
+    "trailing_comma",      # comma before a closing bracket
+    "mismatched_bracket",  # closing bracket of the wrong kind
+    "truncated",           # document cut off; incomplete tail dropped and structures closed (opt-in)
+)
+
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+_CLOSERS = {'{': '}', '[': ']'}
+_WORD = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+
+class JSONRepairError(ValueError):
+    """Raised when model output cannot be turned into JSON."""
+
+
+class TruncatedJSONError(JSONRepairError):
+    """Raised when model output was cut off and the caller needs the complete document."""
+
+
+def repair_json(text):
+    """
+    Turn slightly malformed model output into valid JSON text.
+
+    Text around the first top-level object/array is dropped. A document cut off
+    mid-way is trimmed back to its last complete value (an object inside an
+    array counts as one value) and its open objects and arrays are closed.
+
+    Args:
+        text (str): Raw model output
+
+    Returns:
+        tuple: (json_text, repairs) where repairs lists the REPAIR_KINDS applied
+
+    Raises:
+        JSONRepairError: If the text contains no JSON object or array
+    """
+    starts = [i for i in (text.find('{'), text.find('[')) if i >= 0]
+    if not starts:
+        raise JSONRepairError("No JSON object found in response")
+    start = min(starts)
+
+    repairs = set()
+    if text[:start].strip():
+        repairs.add("surrounding_text")
+
+    out = []
+    stack = []  # [opening bracket, expecting a key (objects only)]
+    last = None  # last significant character written
+    spaced = False  # whitespace seen since the last significant character
+    # Positions where the document is complete if closed: (length of out, closing brackets)
+    safe_points = [(0, "")]
+    in_string = False
+    escape = False
+    string_is_key = False
+    end = len(text)
+    i = start
+
+    def mark_safe():
+        # Objects inside arrays (e.g. workflow jobs) are kept whole or dropped, never cut
+        if not any(stack[k][0] == '{' and stack[k - 1][0] == '[' for k in range(1, len(stack))):
+            safe_points.append((len(out), "".join(_CLOSERS[entry[0]] for entry in reversed(stack))))
+
+    while i < end:
+        c = text[i]
+
+        if in_string:
+            if escape:
+                escape = False
+                out.append(c)
+            elif c == '\\':
+                escape = True
+                out.append(c)
+            elif c == '"':
+                in_string = False
+                out.append(c)
+                last = c
+                if not string_is_key:
+                    mark_safe()
+            elif c in _CONTROL_ESCAPES:
+                repairs.add("control_characters")
+                out.append(_CONTROL_ESCAPES[c])
+            else:
+                out.append(c)
+            i += 1
+            continue
+
+        if c.isspace():
+            out.append(c)
+            spaced = True
+            i += 1
+            continue
+
+        if c == '/' and text.startswith('//', i):
+            repairs.add("comments")
+            newline = text.find('\n', i)
+            i = end if newline < 0 else newline
+            continue
+        if c == '/' and text.startswith('/*', i):
+            repairs.add("comments")
+            close = text.find('*/', i + 2)
+            i = end if close < 0 else close + 2
+            continue
+
+        # A new value directly after a complete one is missing its comma
+        starts_value = c in '"{[' or (spaced and (c.isalnum() or c == '-'))
+        spaced = False
+        if starts_value and stack and last is not None and (last in '"}]' or last.isalnum()):
+            repairs.add("missing_comma")
+            mark_safe()
+            out.append(',')
+            last = ','
+            if stack[-1][0] == '{':
+                stack[-1][1] = True
+
+        if c == '"':
+            in_string = True
+            string_is_key = bool(stack) and stack[-1][0] == '{' and stack[-1][1]
+            out.append(c)
+        elif c in '{[':
+            stack.append([c, c == '{'])
+            out.append(c)
+            last = c
+            mark_safe()
+        elif c in '}]':
+            if not stack:
+                break
+            if _CLOSERS[stack[-1][0]] != c:
+                repairs.add("mismatched_bracket")
+                c = _CLOSERS[stack[-1][0]]
+            # Drop a comma left in front of the closing bracket
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ',':
+                repairs.add("trailing_comma")
+                out.pop()
+            stack.pop()
+            out.append(c)
+            last = c
+            mark_safe()
+            if not stack:
+                i += 1
+                break
+        elif c == ',':
+            if last not in (',', '{', '[', None):
+                mark_safe()
+                out.append(c)
+                last = c
+            if stack and stack[-1][0] == '{':
+                stack[-1][1] = True
+        elif c == ':':
+            out.append(c)
+            last = c
+            if stack:
+                stack[-1][1] = False
+        else:
+            word = _WORD.match(text, i)
+            if word and word.group() in _PYTHON_LITERALS:
+                repairs.add("python_literals")
+                out.append(_PYTHON_LITERALS[word.group()])
+                i = word.end()
+                last = 'e'
+                continue
+            out.append(c)
+            last = c
+        i += 1
+
+    if text[i:].strip():
+        repairs.add("surrounding_text")
+
+    if stack or in_string:
+        repairs.add("truncated")
+        length, closing = safe_points[-1]
+        del out[length:]
+        while out and (out[-1].isspace() or out[-1] == ','):
+            out.pop()
+        out.append(closing)
+
+    return "".join(out), [kind for kind in REPAIR_KINDS if kind in repairs]
+
+
+class RepairStats:
+    """Counters of parse_model_json() calls per source and per repair kind."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sources = {}
+        self._repairs = {kind: 0 for kind in REPAIR_KINDS}
+
+    def record(self, source, outcome, repairs=()):
+        with self._lock:
+            counts = self._sources.setdefault(source, {"clean": 0, "repaired": 0, "failed": 0})
+            counts[outcome] += 1
+            for kind in repairs:
+                self._repairs[kind] += 1
+
+    def stats(self):
+        with self._lock:
+            totals = {"clean": 0, "repaired": 0, "failed": 0}
+            for counts in self._sources.values():
+                for outcome, count in counts.items():
+                    totals[outcome] += count
+            parsed = sum(totals.values())
+            return {
+                **totals,
+                "repair_rate": round(totals["repaired"] / parsed, 3) if parsed else 0.0,
+                "repairs": dict(self._repairs),
+                "sources": {source: dict(counts) for source, counts in self._sources.items()}
+            }
+
+
+repair_stats = RepairStats()
+
+
+def parse_model_json(text, source="unknown", allow_truncated=False, repairs=None):
+    """
+    Parse JSON returned by the model, repairing common defects locally.
+
+    Output that was cut off is rejected unless the caller accepts the
+    document trimmed back to its last complete value.
+
+    Args:
+        text (str): Raw model output
+        source (str): Caller name used in the repair metrics
+        allow_truncated (bool): Accept a truncated document cut back to its last complete value
+        repairs (list): If given, the REPAIR_KINDS applied are appended to it (e.g. to tell a truncated result apart)
+
+    Returns:
+        The parsed JSON value
+
+    Raises:
+        TruncatedJSONError: If the output was cut off and allow_truncated is False
+        JSONRepairError: If the output cannot be repaired into valid JSON
+    """
+    # Well-formed JSON, possibly wrapped in prose or a markdown fence
+    try:
+        start = min(i for i in (text.find('{'), text.find('[')) if i >= 0)
+        end = max(text.rfind('}'), text.rfind(']')) + 1
+        value = json.loads(text[start:end])
+        repair_stats.record(source, "clean")
+        return value
+    except (AttributeError, TypeError, ValueError):
+        pass
+
+    try:
+        repaired, applied = repair_json(text or "")
+        value = json.loads(repaired)
+    except ValueError as e:
+        repair_stats.record(source, "failed")
+        raise JSONRepairError(f"Could not repair model JSON: {str(e)}") from e
+
+    if "truncated" in applied and not allow_truncated:
+        repair_stats.record(source, "failed", applied)
+        raise TruncatedJSONError("Model JSON is truncated")
+
+    if repairs is not None:
+        repairs.extend(applied)
+    if applied:
+        print(f"Repaired model JSON from {source}: {', '.join(applied)}")
+        repair_stats.record(source, "repaired", applied)
+    else:
+        repair_stats.record(source, "clean")
+    return value
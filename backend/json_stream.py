@@ -0,0 +1,126 @@
+import json
+
+
+class JSONStreamParser:
+    """
+    Incremental parser for a JSON object that arrives in chunks (e.g. a streamed LLM completion).
+
+    feed() scans each chunk once and returns events for the parts of the
+    document that were completed by it:
+
+        ("member", key, value)  a string member of the top-level object
+        ("item", key, value)    an object inside an array member of the top-level object
+        ("end", key)            an array member of the top-level object closed
+
+    Text before the first "{" (such as a ```json fence) and after the
+    top-level object is ignored. result() returns the whole parsed document.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._start = None
+        self._end = None
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._expect_key = False
+        self._key = None
+        self._item_start = None
+
+    @property
+    def text(self):
+        """All text fed so far."""
+        return self._text
+
+    @property
+    def done(self):
+        """True once the top-level object has closed."""
+        return self._end is not None
+
+    def feed(self, chunk):
+        """
+        Scan the next chunk of text.
+
+        Returns:
+            list: Events completed by this chunk
+
+        Raises:
+            json.JSONDecodeError: If a completed member or item is not valid JSON
+        """
+        events = []
+        if self.done or not chunk:
+            return events
+
+        self._text += chunk
+        text = self._text
+        for i in range(self._pos, len(text)):
+            c = text[i]
+
+            if self._start is None:
+                if c == '{':
+                    self._start = i
+                    self._stack.append('{')
+                    self._expect_key = True
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        value = json.loads(text[self._string_start:i + 1])
+                        if self._expect_key:
+                            self._key = value
+                        else:
+                            events.append(("member", self._key, value))
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in '{[':
+                if c == '{' and self._stack == ['{', '[']:
+                    self._item_start = i
+                self._stack.append(c)
+            elif c in '}]':
+                self._stack.pop()
+                if c == '}' and self._stack == ['{', '[']:
+                    events.append(("item", self._key, json.loads(text[self._item_start:i + 1])))
+                elif c == ']' and self._stack == ['{']:
+                    events.append(("end", self._key))
+                elif not self._stack:
+                    self._end = i + 1
+                    break
+            elif len(self._stack) == 1:
+                if c == ',':
+                    self._expect_key = True
+                elif c == ':':
+                    self._expect_key = False
+
+        self._pos = len(text) if self._end is None else self._end
+        return events
+
+    def result(self):
+        """
+        Return the parsed top-level object.
+
+        Raises:
+            ValueError: If the object has not been completed
+        """
+        if not self.done:
+            raise ValueError("Incomplete JSON document")
+        return json.loads(self._text[self._start:self._end])
+
+
+def completion_chunks(completion):
+    """Yield the text deltas of a streamed chat completion."""
+    for chunk in completion:
+        if chunk.choices and hasattr(chunk.choices[0], "delta"):
+            content = getattr(chunk.choices[0].delta, "content", None)
+            if content:
+                yield content
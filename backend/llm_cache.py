@@ -0,0 +1,87 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Seconds a cached LLM response stays valid
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "86400"))
+
+# Maximum number of cached LLM responses (least recently used are evicted first)
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))
+
+
+def normalize_use_case(text):
+    """Lowercase and collapse whitespace so trivially different submissions share a cache entry."""
+    return re.sub(r'\s+', ' ', (text or '')).strip().lower()
+
+
+class ResponseCache:
+    """
+    Thread-safe TTL + LRU cache for LLM responses.
+
+    Entries are the list of streamed chunks, so a hit can be replayed to the
+    client exactly as the original stream was sent.
+    """
+
+    def __init__(self, max_items, ttl):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._items = OrderedDict()  # key -> (stored_at, chunks)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+
+    @staticmethod
+    def make_key(*parts):
+        return hashlib.sha256("\x1f".join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return the cached chunks for a key, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None and self.ttl > 0 and time.time() - entry[0] > self.ttl:
+                del self._items[key]
+                self._stats["expired"] += 1
+                entry = None
+
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+
+            self._items.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key, chunks):
+        if self.max_items <= 0:
+            return
+        with self._lock:
+            self._items[key] = (time.time(), tuple(chunks))
+            self._items.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "size": len(self._items),
+                "max_items": self.max_items,
+                "ttl_seconds": self.ttl,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0
+            }
+
+
+# Cache for manualworkflow.proposed_workflow responses
+proposed_workflow_cache = ResponseCache(LLM_CACHE_SIZE, LLM_CACHE_TTL)
+
+# Cache for importexport.analyze_documentation results (one-item list holding the JSON text)
+documentation_analysis_cache = ResponseCache(LLM_CACHE_SIZE, LLM_CACHE_TTL)
@@ -0,0 +1,128 @@
+import os
+import threading
+
+# Connections the Azure OpenAI pool may open at once; sized for one per gunicorn thread streaming a completion
+AZURE_OPENAI_MAX_CONNECTIONS = int(os.getenv("AZURE_OPENAI_MAX_CONNECTIONS", "256"))
+
+# Idle connections kept open (TLS session included) for the next request
+AZURE_OPENAI_KEEPALIVE_CONNECTIONS = int(os.getenv("AZURE_OPENAI_KEEPALIVE_CONNECTIONS", "64"))
+
+# Seconds an idle pooled connection is kept before it is closed
+AZURE_OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("AZURE_OPENAI_KEEPALIVE_EXPIRY", "60"))
+
+# Seconds to open a connection, and to wait for a free one when the pool is exhausted
+AZURE_OPENAI_CONNECT_TIMEOUT = float(os.getenv("AZURE_OPENAI_CONNECT_TIMEOUT", "10"))
+AZURE_OPENAI_POOL_TIMEOUT = float(os.getenv("AZURE_OPENAI_POOL_TIMEOUT", "30"))
+
+# Streaming calls: seconds allowed between two chunks (not for the whole stream)
+AZURE_OPENAI_STREAM_READ_TIMEOUT = float(os.getenv("AZURE_OPENAI_STREAM_READ_TIMEOUT", "60"))
+
+# Bulk (non-streamed) calls: seconds to wait for the complete response
+AZURE_OPENAI_BULK_READ_TIMEOUT = float(os.getenv("AZURE_OPENAI_BULK_READ_TIMEOUT", "180"))
+
+# Retries the SDK makes on connection errors, 408/409/429 and 5xx responses
+AZURE_OPENAI_MAX_RETRIES = int(os.getenv("AZURE_OPENAI_MAX_RETRIES", "2"))
+
+_clients = {}
+_async_client = None
+_client_lock = threading.Lock()
+
+
+def _limits():
+    import httpx
+    return httpx.Limits(
+        max_connections=AZURE_OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=AZURE_OPENAI_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=AZURE_OPENAI_KEEPALIVE_EXPIRY
+    )
+
+
+def _timeout(streaming):
+    import httpx
+    return httpx.Timeout(
+        connect=AZURE_OPENAI_CONNECT_TIMEOUT,
+        read=AZURE_OPENAI_STREAM_READ_TIMEOUT if streaming else AZURE_OPENAI_BULK_READ_TIMEOUT,
+        write=AZURE_OPENAI_CONNECT_TIMEOUT,
+        pool=AZURE_OPENAI_POOL_TIMEOUT
+    )
+
+
+def _client_settings():
+    return {
+        "api_key": os.getenv("AZURE_OPENAI_KEY"),
+        "api_version": os.getenv("AZURE_OPENAI_API_VERSION"),
+        "azure_endpoint": os.getenv("AZURE_OPENAI_ENDPOINT"),
+        "max_retries": AZURE_OPENAI_MAX_RETRIES
+    }
+
+
+def get_openai_client(streaming=False):
+    """
+    The AzureOpenAI client shared by the blueprints, built on first use.
+
+    Streaming and bulk callers get two views of one client that share a single
+    keep-alive connection pool, so concurrent generations reuse warm (already
+    TLS-negotiated) connections. They only differ in the read timeout: a
+    stream may take minutes as long as chunks keep coming, while a bulk call
+    waits for the whole response at once. The openai package is imported here
+    rather than at module import, so processes that never call the model do
+    not pay for it.
+
+    Args:
+        streaming (bool): Whether the caller passes stream=True
+
+    Returns:
+        AzureOpenAI: Client configured from AZURE_OPENAI_KEY, AZURE_OPENAI_ENDPOINT and AZURE_OPENAI_API_VERSION
+    """
+    client = _clients.get(streaming)
+    if client is None:
+        with _client_lock:
+            if not _clients:
+                from openai import AzureOpenAI, DefaultHttpxClient
+                base = AzureOpenAI(
+                    **_client_settings(),
+                    timeout=_timeout(False),
+                    http_client=DefaultHttpxClient(limits=_limits(), timeout=_timeout(False))
+                )
+                _clients[False] = base
+                _clients[True] = base.with_options(timeout=_timeout(True))
+            client = _clients[streaming]
+    return client
+
+
+def get_async_openai_client():
+    """
+    The AsyncAzureOpenAI client for streamed completions, with its own pool sized like the sync one.
+
+    Only use it from the event loop it was first used on (llm_streaming runs all of them on one loop).
+
+    Returns:
+        AsyncAzureOpenAI: Client with the streaming timeouts
+    """
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                from openai import AsyncAzureOpenAI, DefaultAsyncHttpxClient
+                _async_client = AsyncAzureOpenAI(
+                    **_client_settings(),
+                    timeout=_timeout(True),
+                    http_client=DefaultAsyncHttpxClient(limits=_limits(), timeout=_timeout(True))
+                )
+    return _async_client
+
+
+def client_settings():
+    """Pool and timeout settings of the shared clients, for /metrics."""
+    return {
+        "max_connections": AZURE_OPENAI_MAX_CONNECTIONS,
+        "keepalive_connections": AZURE_OPENAI_KEEPALIVE_CONNECTIONS,
+        "keepalive_expiry_seconds": AZURE_OPENAI_KEEPALIVE_EXPIRY,
+        "connect_timeout_seconds": AZURE_OPENAI_CONNECT_TIMEOUT,
+        "pool_timeout_seconds": AZURE_OPENAI_POOL_TIMEOUT,
+        "stream_read_timeout_seconds": AZURE_OPENAI_STREAM_READ_TIMEOUT,
+        "bulk_read_timeout_seconds": AZURE_OPENAI_BULK_READ_TIMEOUT,
+        "max_retries": AZURE_OPENAI_MAX_RETRIES,
+        "sync_client_created": bool(_clients),
+        "async_client_created": _async_client is not None
+    }
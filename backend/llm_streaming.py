@@ -0,0 +1,111 @@
+import os
+import sys
+import queue
+import asyncio
+import threading
+from json_stream import completion_chunks
+from llm_clients import get_openai_client, get_async_openai_client
+
+# Run streamed completions on the shared asyncio event loop ("0" streams with the blocking client in the request thread)
+LLM_ASYNC_STREAMING = os.getenv("LLM_ASYNC_STREAMING", "1") == "1"
+
+_loop = None
+_loop_lock = threading.Lock()
+_DONE = object()
+
+
+def _get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-stream-loop", daemon=True).start()
+        return _loop
+
+
+def _green_threads():
+    """True under gevent monkey patching, where a real event loop thread would block the workers."""
+    monkey = sys.modules.get("gevent.monkey")
+    return monkey is not None and monkey.is_module_patched("threading")
+
+
+async def astream_chat_completion(model, messages, **kwargs):
+    """
+    Yield the text deltas of a chat completion streamed by the async client.
+
+    Args:
+        model (str): Azure OpenAI deployment
+        messages (list): Chat messages
+        **kwargs: Extra arguments for chat.completions.create()
+
+    Yields:
+        str: Non-empty content deltas, in order
+    """
+    completion = await get_async_openai_client().chat.completions.create(
+        model=model,
+        messages=messages,
+        stream=True,
+        **kwargs
+    )
+    try:
+        async for chunk in completion:
+            if chunk.choices and hasattr(chunk.choices[0], "delta"):
+                content = getattr(chunk.choices[0].delta, "content", None)
+                if content:
+                    yield content
+    finally:
+        await completion.close()
+
+
+def stream_chat_completion(model, messages, **kwargs):
+    """
+    Yield the text deltas of a streamed chat completion to a (sync) Flask response.
+
+    With LLM_ASYNC_STREAMING the completion runs as a task on one shared event
+    loop, which multiplexes every in-flight completion over the async client's
+    connection pool; the request thread only waits for the next delta. Closing
+    the generator (e.g. the browser disconnected) cancels the task and the
+    upstream request. Otherwise, or under gevent, the blocking client streams
+    in the request thread as before.
+
+    Args:
+        model (str): Azure OpenAI deployment
+        messages (list): Chat messages
+        **kwargs: Extra arguments for chat.completions.create()
+
+    Yields:
+        str: Non-empty content deltas, in order
+
+    Raises:
+        Exception: Whatever the completion request raised, in the consuming thread
+    """
+    if not LLM_ASYNC_STREAMING or _green_threads():
+        yield from completion_chunks(get_openai_client(streaming=True).chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            **kwargs
+        ))
+        return
+
+    deltas = queue.Queue()
+
+    async def pump():
+        try:
+            async for content in astream_chat_completion(model, messages, **kwargs):
+                deltas.put(content)
+            deltas.put(_DONE)
+        except Exception as e:
+            deltas.put(e)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), _get_loop())
+    try:
+        while True:
+            item = deltas.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        future.cancel()
@@ -0,0 +1,121 @@
+from flask import Blueprint, jsonify
+from environments import get_pool_stats
+from artifacts import artifact_store
+from llm_cache import proposed_workflow_cache, documentation_analysis_cache
+from similarity import use_case_index
+from deploys import deploy_queue
+from prompts import prompt_stats
+from json_repair import repair_stats
+from document_extraction import extracted_text_cache
+from importexport import publish_queue
+from workflow_fragments import job_fragments
+from startup import blueprint_import_times, startup_task_times
+from llm_clients import client_settings
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/environments', methods=['GET'])
+def environment_pool_stats():
+    """Connection pool and reuse statistics for the cached Control-M environments."""
+    try:
+        return jsonify(get_pool_stats()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@metrics_bp.route('/artifacts', methods=['GET'])
+def artifact_store_stats():
+    """Size of the in-memory workflow artifact cache and its pending disk writes."""
+    try:
+        return jsonify(artifact_store.stats()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@metrics_bp.route('/llm_cache', methods=['GET'])
+def llm_cache_stats():
+    """Hit/miss counters of the LLM response caches and the similar use case index."""
+    try:
+        return jsonify({
+            "proposed_workflow": proposed_workflow_cache.stats(),
+            "documentation_analysis": documentation_analysis_cache.stats(),
+            "similar_use_cases": use_case_index.stats()
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@metrics_bp.route('/deploys', methods=['GET'])
+def deploy_queue_stats():
+    """Worker pool size and the number of deploys in each stage."""
+    try:
+        return jsonify(deploy_queue.stats()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@metrics_bp.route('/prompts', methods=['GET'])
+def prompt_token_stats():
+    """Locally measured token counts of the static and per-request parts of each LLM prompt."""
+    try:
+        return jsonify(prompt_stats()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@metrics_bp.route('/json_repair', methods=['GET'])
+def json_repair_stats():
+    """How often model JSON parsed cleanly, needed local repair, or could not be repaired."""
+    try:
+        return jsonify(repair_stats.stats()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@metrics_bp.route('/documents', methods=['GET'])
+def document_cache_stats():
+    """Size and hit/miss counters of the extracted document text cache."""
+    try:
+        return jsonify({"extracted_text": extracted_text_cache.stats()}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@metrics_bp.route('/github', methods=['GET'])
+def github_publish_stats():
+    """Stage counts and backlog of the background GitHub publish queue."""
+    try:
+        return jsonify(publish_queue.stats()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@metrics_bp.route('/workflow_fragments', methods=['GET'])
+def workflow_fragment_stats():
+    """Spliced vs object-graph renders and the catalog self-test of the job fragment cache."""
+    try:
+        return jsonify(job_fragments.stats()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@metrics_bp.route('/startup', methods=['GET'])
+def startup_stats():
+    """Seconds each blueprint module took to import, and each warm-up task to run, when the process started."""
+    try:
+        return jsonify({
+            "blueprints": blueprint_import_times,
+            "tasks": startup_task_times,
+            "total_seconds": round(sum(blueprint_import_times.values()) + sum(startup_task_times.values()), 3)
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@metrics_bp.route('/llm_clients', methods=['GET'])
+def llm_client_stats():
+    """Connection pool and timeout settings of the shared Azure OpenAI clients."""
+    try:
+        return jsonify(client_settings()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
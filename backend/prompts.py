@@ -0,0 +1,462 @@
+import os
+import threading
+from functools import lru_cache
+from job_library import JOB_LIBRARY, catalog_version
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Tokenizer used to measure prompts locally (tiktoken encoding name). tiktoken downloads
+# the encoding on first use unless it is found in TIKTOKEN_CACHE_DIR (see the README).
+PROMPT_TOKEN_ENCODING = os.getenv("PROMPT_TOKEN_ENCODING", "o200k_base")
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_prompt_stats = {}
+
+
+def load_encoding():
+    """
+    Load the tokenizer once; app.py calls this at startup so no request waits for the download.
+
+    Concurrent first callers wait for the one load rather than falling back to the estimate.
+
+    Returns:
+        tiktoken.Encoding: The encoding, or None if tiktoken is missing or the encoding could not be loaded
+    """
+    global _encoding, _encoding_loaded
+    if _encoding_loaded:
+        return _encoding
+    with _encoding_lock:
+        if not _encoding_loaded:
+            if tiktoken is not None:
+                try:
+                    _encoding = tiktoken.get_encoding(PROMPT_TOKEN_ENCODING)
+                except Exception as e:
+                    print(f"WARNING: Could not load tokenizer {PROMPT_TOKEN_ENCODING}, estimating prompt tokens: {str(e)}")
+            _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text):
+    """Count the tokens of a text locally (tiktoken when available, otherwise ~4 characters per token)."""
+    encoding = load_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+# Catalog groups by key prefix, in display order
+_CATALOG_GROUPS = [
+    ("AWS", lambda key: key.startswith("AWS_")),
+    ("Azure", lambda key: key.startswith("AZURE_")),
+    ("GCP", lambda key: key.startswith("GCP_")),
+    ("OCI", lambda key: key.startswith("OCI_")),
+    ("Data sources", lambda key: key.startswith("Data_")),
+    ("Control-M jobs", lambda key: key.startswith("Job") or key == "WebServiceREST"),
+]
+
+
+def catalog_group(key):
+    """Category of a JOB_LIBRARY key ("AWS", "Azure", ..., "Tools")."""
+    return next((name for name, matches in _CATALOG_GROUPS if matches(key)), "Tools")
+
+
+def format_catalog(keys):
+    """Format technology ids as a compact, category-grouped catalog block (keys keep their given order)."""
+    groups = {name: [] for name, _ in _CATALOG_GROUPS}
+    groups["Tools"] = []
+    for key in keys:
+        groups[catalog_group(key)].append(key)
+
+    lines = [f"{name}: {', '.join(keys)}" for name, keys in groups.items() if keys]
+    return "TECHNOLOGY CATALOG (ids grouped by category; use ids exactly as written):\n" + "\n".join(lines)
+
+
+@lru_cache(maxsize=4)
+def _catalog_block(version):
+    return format_catalog(JOB_LIBRARY)
+
+
+# Stands in for the catalog in system prompts when a per-request shortlist is sent with the user message
+_CATALOG_IN_USER_MESSAGE = "The TECHNOLOGY CATALOG for this request is listed at the end of the user message."
+
+
+def catalog_block():
+    """The JOB_LIBRARY keys as a compact, category-grouped block (rebuilt only when the catalog changes)."""
+    return _catalog_block(catalog_version())
+
+
+_WORKFLOW_JSON_STRUCTURE = """{
+  "folder_name": "industry-specific-job-name",
+  "subfolders": [
+    {
+      "name": "subfolder_name",
+      "description": "subfolder description",
+      "phase": "1",
+      "events": {
+        "add": ["subfolder_complete_event"],
+        "wait": ["previous_subfolder_complete_event"],
+        "delete": ["previous_subfolder_complete_event"]
+      }
+    }
+  ],
+  "jobs": [
+    {
+      "id": "unique_job_id",
+      "name": "descriptive_job_name",
+      "type": "technology_from_list",
+      "subfolder": "subfolder_name",
+      "concurrent_group": "group_1",
+      "wait_for_jobs": ["job_id_1", "job_id_2"]
+    }
+  ]
+}"""
+
+PROPOSED_WORKFLOW_SYSTEM = """You are an AI assistant that suggests optimal technology workflows for BMC Control-M based on business use cases.
+You MUST ONLY suggest technologies from the technology catalog below.
+Your response should be in JSON format with this structure:
+{"technologies": ["Technology1", "Technology2"]}
+IMPORTANT:
+1. Only use technologies from the catalog
+2. Do NOT modify or rename the technologies - use them exactly as they appear in the catalog
+3. Return ONLY the JSON object, no markdown formatting, no code blocks, no additional text
+4. Make sure the response is valid JSON
+5. Focus on suggesting the most relevant technologies for the use case
+
+{catalog}"""
+
+PROPOSED_WORKFLOW_USER = """Based on the following use case, suggest a list of technologies from the catalog that would best solve this business need.
+Use Case: {use_case}
+
+Return ONLY a JSON object with the suggested technologies array. No markdown, no code blocks, no additional text."""
+
+_FOLDER_NAMING_RULES = """FOLDER NAMING RULES:
+- Generate a descriptive folder name based on the use case
+- Use the format: "industry-specific-job-name" (e.g., "loan-processing", "clinical-data", "inventory-management")
+- Make it concise but descriptive (2 words max)
+- Use lowercase with hyphens
+- Focus on the main business process or industry domain
+- Examples: "loan-processing", "clinical-data", "inventory-management", "customer-onboarding", "financial-reporting"
+
+"""
+
+_AI_WORKFLOW_SYSTEM = """You are an expert BMC Control-M workflow architect that creates complex workflows with multiple subfolders, realistic job dependencies, and logical business processes.
+
+CRITICAL REQUIREMENTS:
+1. Create AT LEAST 3 subfolders per workflow representing logical phases
+2. Use ONLY technologies from the technology catalog below
+3. Subfolder names should be personalized based on the use case
+4. Create logical dependencies BETWEEN SUBFOLDERS using events
+5. Each subfolder should have AT LEAST 5 jobs total
+6. Return ONLY valid JSON with this exact structure:
+""" + _WORKFLOW_JSON_STRUCTURE + """
+
+{folder_naming}JOB NAMING AND LOGIC:
+- Each job must have a UNIQUE, DESCRIPTIVE name that makes logical sense for the use case
+- Each job should not be longer than 3 words
+- Job names should clearly indicate what the job does (e.g., "extract_customer_data", "validate_inventory", "generate_sales_report")
+- Avoid generic names like "job1", "process1" - be specific and business-relevant
+- Names should reflect the actual business process being automated
+- Use descriptive names like: "Analyse_Data_Hadoop", "Cleansing_Transformation_Spark", "Summary_Power_BI", "Data_SAP_inventory", "Data_SFDC", "Transfer_to_Centralized_Repo"
+- Job names should be specific to the technology and business function
+- NEVER use generic names like "job1", "jobA", "process1", "task1" - always be descriptive
+- Follow the naming pattern: [Action]_[Technology]_[BusinessFunction] or [Technology]_[BusinessFunction]
+
+CONCURRENT JOB PATTERNS WITH DEPENDENCIES:
+- Be flexible and realistic based on the use case
+- Some subfolders might have 2-3 concurrent jobs, others might have 4-5
+- Consider what makes sense for the business process
+- Create realistic intra-subfolder dependencies where some jobs wait for others
+- Example patterns:
+  * Phase 1: Data collection (3-5 concurrent jobs gathering different data sources)
+  * Phase 2: Data processing (2-3 concurrent jobs processing the collected data)
+  * Phase 3: Reporting/Analysis (1-2 jobs creating final outputs)
+- Let the use case drive the number of concurrent jobs, not arbitrary rules
+
+INTRA-SUBFOLDER DEPENDENCIES:
+- Some jobs within the same subfolder should wait for other concurrent jobs to finish
+- Use the "wait_for_jobs" field to specify which jobs must complete first
+- Create realistic business logic (e.g., data validation waits for data extraction, aggregation waits for individual processing)
+- Example: In a data processing subfolder:
+  * Jobs 1-3: Extract data from different sources (concurrent)
+  * Job 4: Validate all extracted data (waits for jobs 1-3)
+  * Job 5: Aggregate validated data (waits for job 4)
+- Mix concurrent and dependent jobs within the same subfolder for realistic workflows
+- Jobs without "wait_for_jobs" run concurrently with other jobs in the same subfolder
+- Jobs with "wait_for_jobs" wait for specific jobs to complete before starting
+- This creates realistic business processes where some tasks can run in parallel while others must wait
+
+RULES:
+- Subfolder names should be descriptive and use case-specific
+- Job names should be descriptive and relevant to the use case
+- Each subfolder represents a logical phase of the workflow
+- Jobs within the same subfolder can have dependencies on other jobs in the same subfolder
+- Dependencies between subfolders are handled through subfolder events (wait/add/delete)
+- Use realistic job types that make sense for the use case
+- Ensure all technologies are from the catalog
+- Create a logical flow: Phase1 -> Phase2 -> Phase3
+- Each subfolder should have a unique phase number
+- Be creative and realistic with concurrent job patterns based on the use case
+- Each job must have a unique, logical name that clearly describes its purpose
+
+{catalog}"""
+
+AI_WORKFLOW_SYSTEM = _AI_WORKFLOW_SYSTEM.replace("{folder_naming}", "")
+AI_PROMPT_WORKFLOW_SYSTEM = _AI_WORKFLOW_SYSTEM.replace("{folder_naming}", _FOLDER_NAMING_RULES)
+
+AI_WORKFLOW_USER = """Create a complex BMC Control-M workflow for this use case:
+
+Use Case: {use_case}
+
+Requirements:
+- At least 3 subfolders representing logical phases
+- Create realistic concurrent job patterns based on the use case
+- Mix concurrent and dependent jobs within subfolders for realistic business logic
+- Some jobs should run concurrently, others should wait for specific jobs to complete
+- Use the "wait_for_jobs" field to create logical dependencies within subfolders
+- Create logical dependencies between subfolders using events
+- Use only technologies from the catalog
+- Each job must have a descriptive, logical name (like "Analyse_Data_Hadoop", "Cleansing_Transformation_Spark")
+- NEVER use generic names like "job1", "jobA", "process1" - always be descriptive and business-relevant
+
+Let the use case drive the workflow design - be creative and realistic with job patterns."""
+
+MANUAL_WORKFLOW_SYSTEM = """You are an expert BMC Control-M workflow architect that creates complex workflows with multiple subfolders, realistic job dependencies, and logical business processes.
+The user message gives the use case, the SELECTED TECHNOLOGIES and the USER CODE.
+
+CRITICAL REQUIREMENTS:
+1. Use ALL of the selected technologies - EVERY technology must be represented by at least one job
+2. Create AT LEAST 3 subfolders per workflow representing logical phases
+3. Subfolder names should be personalized based on the use case
+4. Create logical dependencies BETWEEN SUBFOLDERS using events
+5. Each subfolder should have AT LEAST 2 jobs total
+6. Return ONLY valid JSON with this exact structure:
+""" + _WORKFLOW_JSON_STRUCTURE + """
+
+MANDATORY TECHNOLOGY USAGE:
+- You MUST create at least one job for EACH selected technology
+- Do NOT skip any technology - every technology must be represented
+- If you need more jobs to create a realistic workflow, you can use the same technology multiple times
+- The "type" field for each job must be exactly one of the selected technologies
+- Count the technologies and ensure you have at least that many jobs
+
+JOB NAMING AND LOGIC:
+- Each job must have a descriptive, logical name (like "<USER CODE>-Analyse-Data-Hadoop", "<USER CODE>-Cleansing-Transformation-Spark")
+- NEVER use generic names like "job1", "jobA", "process1" - always be descriptive and business-relevant
+- MANDATORY: Every job name MUST start with the "<USER CODE>-" prefix
+- MANDATORY: Ensure every selected technology is used at least once
+
+FOLDER AND SUBFOLDER NAMING:
+- Folder names should be descriptive and use case-specific
+- Use ONLY letters, digits, and hyphens (-) in folder and subfolder names
+- NO underscores (_) or other special characters allowed
+- Examples: "<USER CODE>-customer-data-processing", "<USER CODE>-inventory-management", "<USER CODE>-sales-reporting"
+- MANDATORY: Every folder and subfolder name MUST start with the "<USER CODE>-" prefix
+
+CONCURRENT JOB PATTERNS WITH DEPENDENCIES:
+- Be flexible and realistic based on the use case
+- Some subfolders might have 2-3 concurrent jobs, others might have 4-5
+- Consider what makes sense for the business process
+- Create realistic intra-subfolder dependencies where some jobs wait for others
+- Example patterns:
+  * Phase 1: Data collection (2-3 concurrent jobs gathering different data sources)
+  * Phase 2: Data processing (2-3 concurrent jobs processing the collected data)
+  * Phase 3: Reporting/Analysis (1-2 jobs creating final outputs)
+- Let the use case drive the number of concurrent jobs, not arbitrary rules
+
+INTRA-SUBFOLDER DEPENDENCIES:
+- Some jobs within the same subfolder should wait for other concurrent jobs to finish
+- Use the "wait_for_jobs" field to specify which jobs must complete first
+- Create realistic business logic (e.g., data validation waits for data extraction, aggregation waits for individual processing)
+- Example: In a data processing subfolder:
+  * Jobs 1-2: Extract data from different sources (concurrent)
+  * Job 3: Validate all extracted data (waits for jobs 1-2)
+  * Job 4: Aggregate validated data (waits for job 3)
+- Mix concurrent and dependent jobs within the same subfolder for realistic workflows
+- Jobs without "wait_for_jobs" run concurrently with other jobs in the same subfolder
+- Jobs with "wait_for_jobs" wait for specific jobs to complete before starting
+- This creates realistic business processes where some tasks can run in parallel while others must wait
+
+RULES:
+- Subfolder names should be descriptive and use case-specific
+- Job names should be descriptive and relevant to the use case
+- Each subfolder represents a logical phase of the workflow
+- Jobs within the same subfolder can have dependencies on other jobs in the same subfolder
+- Dependencies between subfolders are handled through subfolder events (wait/add/delete)
+- Use realistic job types that make sense for the use case
+- Ensure ALL technologies are from the selected list and ALL are used
+- Create a logical flow: Phase1 -> Phase2 -> Phase3
+- Each subfolder should have a unique phase number
+- Be creative and realistic with concurrent job patterns based on the use case
+- Each job must have a unique, logical name that clearly describes its purpose
+- Use the exact technology names from the selected list for the "type" field
+- MANDATORY: Verify that every selected technology is used at least once"""
+
+MANUAL_WORKFLOW_USER = """Create a complex BMC Control-M workflow for this use case:
+
+Use Case: {use_case}
+SELECTED TECHNOLOGIES: {technologies}
+USER CODE: {user_code}
+
+CRITICAL REQUIREMENTS:
+- Use ALL of the selected technologies - every technology must be represented
+- At least 3 subfolders representing logical phases
+- Create realistic concurrent job patterns based on the use case
+- Mix concurrent and dependent jobs within subfolders for realistic business logic
+- Some jobs should run concurrently, others should wait for specific jobs to complete
+- Use the "wait_for_jobs" field to create logical dependencies within subfolders
+- Create logical dependencies between subfolders using events
+- Use only the selected technologies
+- Each job must have a descriptive, logical name (like "Analyse-Data-Hadoop", "Cleansing-Transformation-Spark")
+- NEVER use generic names like "job1", "jobA", "process1" - always be descriptive and business-relevant
+- MANDATORY: Ensure every selected technology is used at least once
+- MANDATORY: Every folder, subfolder and job name starts with "{user_code}-"
+
+Let the use case drive the workflow design - be creative and realistic with job patterns."""
+
+DOCUMENTATION_SYSTEM = """You are an AI assistant that analyzes documentation to extract workflow requirements and technologies.
+Your response must be in JSON format with this structure:
+{
+  "extracted_use_case": "Detailed use case extracted from documentation",
+  "suggested_technologies": ["Technology1", "Technology2", "Technology3", "Technology4", "Technology5", "Technology6", "Technology7", "Technology8", "Technology9", "Technology10"],
+  "workflow_order": ["Technology1", "Technology2", "Technology3", "Technology4", "Technology5", "Technology6", "Technology7", "Technology8", "Technology9", "Technology10"],
+  "analysis_summary": "Brief summary of the analysis",
+  "technologies_for_manual_workflow": ["Technology1", "Technology2", "Technology3", "Technology4", "Technology5", "Technology6", "Technology7", "Technology8", "Technology9", "Technology10"]
+}
+
+CRITICAL REQUIREMENTS:
+1. You MUST suggest AT LEAST 10 technologies from the technology catalog below
+2. Do NOT suggest technologies that are not in the catalog
+3. Extract the most relevant use case details from the documentation
+4. Consider both the provided use case and the documentation content
+5. Suggest technologies that best match the requirements and create a comprehensive workflow
+6. Provide a logical workflow order based on dependencies
+7. The "technologies_for_manual_workflow" field should contain the same technologies as "suggested_technologies" - this is for direct input to the manual workflow generation
+8. For Excel files, analyze the data structure, column headers, and data patterns to understand the workflow requirements
+9. If the documentation doesn't clearly indicate 10 technologies, select additional relevant technologies from the catalog to create a comprehensive workflow
+10. Ensure the workflow covers data ingestion, processing, storage, analysis, and reporting phases
+11. Return ONLY the JSON object, no additional text
+
+TECHNOLOGY SELECTION STRATEGY:
+- Always include data processing technologies (AWS_Glue, Azure_Databricks, GCP_Dataflow, etc.)
+- Include database/storage technologies (AWS_Redshift, Azure_Synapse, GCP_BigQuery, etc.)
+- Include orchestration technologies (AWS_StepFunctions, GCP_Workflows, etc.)
+- Include monitoring/notification technologies (AWS_SNS, AWS_SQS, etc.)
+- Include compute technologies (AWS_EC2, Azure_VM, GCP_VM, etc.)
+- Include serverless technologies (AWS_Lambda, Azure_Functions, etc.)
+- Include integration technologies (AWS_AppFlow, Azure_LogicApps, etc.)
+- Include backup/security technologies (AWS_Backup, etc.)
+- Include analytics/BI technologies (AWS_QuickSight, MS_PowerBI, Tableau, etc.)
+- Include DevOps technologies (AZURE_DevOps, Jenkins, etc.)
+
+{catalog}"""
+
+DOCUMENTATION_USER = """Analyze this documentation and use case to extract workflow requirements and suggest technologies:
+
+Documentation Content:
+{file_content}
+
+Additional Use Case Context:
+{use_case}
+
+File Type: {file_type}
+
+CRITICAL REQUIREMENTS:
+- You MUST suggest AT LEAST 10 technologies from the catalog
+- Do NOT suggest technologies outside the catalog
+- Create a comprehensive workflow that covers multiple phases (ingestion, processing, storage, analysis, reporting)
+- If the documentation doesn't clearly indicate 10 technologies, select additional relevant technologies to create a complete workflow
+
+Return ONLY a JSON object with the extracted use case, suggested technologies (minimum 10), workflow order, analysis summary, and technologies_for_manual_workflow array."""
+
+SYSTEM_PROMPTS = {
+    "proposed_workflow": PROPOSED_WORKFLOW_SYSTEM,
+    "ai_workflow": AI_WORKFLOW_SYSTEM,
+    "ai_prompt_workflow": AI_PROMPT_WORKFLOW_SYSTEM,
+    "manual_workflow": MANUAL_WORKFLOW_SYSTEM,
+    "documentation": DOCUMENTATION_SYSTEM,
+}
+
+
+@lru_cache(maxsize=32)
+def _system_prompt(name, version, shortlisted=False):
+    catalog = _CATALOG_IN_USER_MESSAGE if shortlisted else catalog_block()
+    content = SYSTEM_PROMPTS[name].replace("{catalog}", catalog)
+    return content, count_tokens(content)
+
+
+def system_prompt(name):
+    """
+    Return the static system prompt for a prompt name.
+
+    The text is built once per catalog version and reused byte-for-byte, so the
+    provider can serve it from its prompt cache.
+    """
+    return _system_prompt(name, catalog_version())[0]
+
+
+def build_messages(name, user_content, candidates=None):
+    """
+    Return the chat messages for a prompt: the static system prompt followed by the per-request user message.
+
+    When candidates (a shortlist of JOB_LIBRARY keys) is given, only those are
+    offered: they are appended to the user message and the system prompt
+    refers to them instead of embedding the full catalog, so it stays static.
+    Token counts of both parts are recorded for prompt_stats().
+    """
+    system_content, system_tokens = _system_prompt(name, catalog_version(), candidates is not None)
+    if candidates is not None:
+        user_content = f"{user_content}\n\n{format_catalog(candidates)}"
+    user_tokens = count_tokens(user_content)
+    stats_name = name if candidates is None else f"{name}_shortlist"
+
+    with _stats_lock:
+        stats = _prompt_stats.setdefault(stats_name, {"calls": 0, "system_tokens": 0, "user_tokens_total": 0})
+        stats["calls"] += 1
+        stats["system_tokens"] = system_tokens
+        stats["user_tokens_total"] += user_tokens
+
+    return [
+        {"role": "system", "content": system_content},
+        {"role": "user", "content": user_content}
+    ]
+
+
+def proposed_workflow_messages(use_case, candidates=None):
+    return build_messages("proposed_workflow", PROPOSED_WORKFLOW_USER.format(use_case=use_case), candidates)
+
+
+def ai_workflow_messages(use_case, folder_naming_rules=False, candidates=None):
+    name = "ai_prompt_workflow" if folder_naming_rules else "ai_workflow"
+    return build_messages(name, AI_WORKFLOW_USER.format(use_case=use_case), candidates)
+
+
+def manual_workflow_messages(use_case, technologies, user_code):
+    return build_messages("manual_workflow", MANUAL_WORKFLOW_USER.format(
+        use_case=use_case, technologies=", ".join(technologies), user_code=user_code))
+
+
+def documentation_messages(file_content, use_case, file_type):
+    return build_messages("documentation", DOCUMENTATION_USER.format(
+        file_content=file_content, use_case=use_case, file_type=file_type))
+
+
+def prompt_stats():
+    """Static and per-request token counts of every prompt built so far."""
+    with _stats_lock:
+        return {
+            "tokenizer": PROMPT_TOKEN_ENCODING if load_encoding() is not None else "estimate",
+            "prompts": {
+                name: {
+                    "calls": stats["calls"],
+                    "system_tokens": stats["system_tokens"],
+                    "avg_user_tokens": round(stats["user_tokens_total"] / stats["calls"], 1)
+                }
+                for name, stats in _prompt_stats.items()
+            }
+        }
@@ -0,0 +1,157 @@
+import os
+import re
+import json
+import math
+import threading
+from collections import Counter, OrderedDict
+import numpy as np
+
+# Reuse the generation of a near-identical earlier use case instead of calling the LLM
+# ("1" turns it on for every request; a request's "reuse_similar" field overrides it)
+USE_CASE_SIMILARITY_REUSE = os.getenv("USE_CASE_SIMILARITY_REUSE", "0") == "1"
+
+# Cosine similarity above which a previous generation is reused for a new use case
+USE_CASE_SIMILARITY_THRESHOLD = float(os.getenv("USE_CASE_SIMILARITY_THRESHOLD", "0.9"))
+
+# Past use cases remembered per scope (oldest are forgotten first)
+USE_CASE_INDEX_SIZE = int(os.getenv("USE_CASE_INDEX_SIZE", "500"))
+
+_STOPWORDS = {
+    'a', 'an', 'and', 'as', 'at', 'by', 'for', 'from', 'in', 'into', 'of', 'on', 'or',
+    'the', 'to', 'with', 'our', 'their', 'that', 'this', 'using', 'use', 'case', 'workflow'
+}
+
+
+def tokenize(text):
+    """
+    Features for a use case: content words plus character 4-grams of each word.
+
+    The n-grams make inflections ("forecast" / "forecasting") and small typos
+    overlap, which word tokens alone would miss.
+    """
+    words = [word for word in re.findall(r'[a-z0-9]+', (text or '').lower()) if word not in _STOPWORDS]
+    features = [f"w:{word}" for word in words]
+    for word in words:
+        padded = f"#{word}#"
+        features.extend(f"c:{padded[i:i + 4]}" for i in range(max(1, len(padded) - 3)))
+    return Counter(features)
+
+
+class UseCaseIndex:
+    """
+    Offline TF-IDF index of past use cases and the workflows generated for them.
+
+    Entries are partitioned by scope (e.g. catalog version and selected
+    technologies) so a workflow is only reused where it would still be valid.
+    Vectors are L2-normalized TF-IDF over tokenize() features; the matrix of a
+    scope is rebuilt lazily after it changes.
+    """
+
+    def __init__(self, max_items, threshold):
+        self.max_items = max_items
+        self.threshold = threshold
+        self._scopes = {}
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "matches": 0, "added": 0}
+
+    def _scope(self, scope):
+        state = self._scopes.get(scope)
+        if state is None:
+            state = {"entries": OrderedDict(), "matrix": None, "vocabulary": None, "idf": None}
+            self._scopes[scope] = state
+        return state
+
+    @staticmethod
+    def _build(state):
+        entries = list(state["entries"].values())
+        document_frequency = Counter()
+        for entry in entries:
+            document_frequency.update(entry["features"].keys())
+
+        vocabulary = {feature: i for i, feature in enumerate(document_frequency)}
+        total = len(entries)
+        idf = np.array([math.log((1 + total) / (1 + document_frequency[feature])) + 1 for feature in vocabulary])
+
+        matrix = np.zeros((total, len(vocabulary)))
+        for row, entry in enumerate(entries):
+            for feature, count in entry["features"].items():
+                matrix[row, vocabulary[feature]] = count
+        matrix *= idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        state["matrix"] = matrix / norms
+        state["vocabulary"] = vocabulary
+        state["idf"] = idf
+        state["rows"] = entries
+
+    def find(self, scope, use_case, threshold=None):
+        """
+        Return the most similar previous generation in a scope, or None below the threshold.
+
+        Returns:
+            dict: "use_case" (matched text), "similarity" (0..1) and "result" (a fresh copy)
+        """
+        threshold = self.threshold if threshold is None else threshold
+        features = tokenize(use_case)
+
+        with self._lock:
+            self._stats["lookups"] += 1
+            state = self._scopes.get(scope)
+            if not state or not state["entries"] or not features:
+                return None
+            if state["matrix"] is None:
+                self._build(state)
+
+            vocabulary = state["vocabulary"]
+            query = np.zeros(len(vocabulary))
+            for feature, count in features.items():
+                column = vocabulary.get(feature)
+                if column is not None:
+                    query[column] = count
+            query *= state["idf"]
+            # Features never seen in this scope still count towards the query norm (at the idf floor of 1)
+            unseen = sum(count * count for feature, count in features.items() if feature not in vocabulary)
+            norm = math.sqrt(float(query @ query) + unseen)
+            if norm == 0:
+                return None
+
+            scores = state["matrix"] @ (query / norm)
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            if similarity < threshold:
+                return None
+
+            entry = state["rows"][best]
+            self._stats["matches"] += 1
+            return {
+                "use_case": entry["use_case"],
+                "similarity": round(similarity, 3),
+                "result": json.loads(entry["result"])
+            }
+
+    def add(self, scope, use_case, result):
+        """Remember the JSON-serializable result generated for a use case."""
+        features = tokenize(use_case)
+        if not features:
+            return
+        key = " ".join(sorted(features.elements()))
+        with self._lock:
+            state = self._scope(scope)
+            state["entries"][key] = {"use_case": use_case, "features": features, "result": json.dumps(result)}
+            state["entries"].move_to_end(key)
+            while len(state["entries"]) > self.max_items:
+                state["entries"].popitem(last=False)
+            state["matrix"] = None
+            self._stats["added"] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                "threshold": self.threshold,
+                "scopes": len(self._scopes),
+                "entries": sum(len(state["entries"]) for state in self._scopes.values())
+            }
+
+
+use_case_index = UseCaseIndex(USE_CASE_INDEX_SIZE, USE_CASE_SIMILARITY_THRESHOLD)
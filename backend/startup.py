@@ -0,0 +1,37 @@
+import time
+from importlib import import_module
+
+# Seconds spent importing each blueprint module, in import order. Dependencies shared by
+# several blueprints are counted for the first one that imports them.
+blueprint_import_times = {}
+
+# Seconds spent in each one-off warm-up task run after the imports (tokenizer, caches)
+startup_task_times = {}
+
+
+def import_blueprint(module_name, blueprint_name):
+    """Import a blueprint module, record how long it took and return the blueprint."""
+    started = time.perf_counter()
+    module = import_module(module_name)
+    blueprint_import_times[module_name] = round(time.perf_counter() - started, 3)
+    return getattr(module, blueprint_name)
+
+
+def run_startup_task(name, task):
+    """Run a warm-up task once at startup and record how long it took."""
+    started = time.perf_counter()
+    try:
+        task()
+    except Exception as e:
+        print(f"WARNING: Startup task {name} failed: {str(e)}")
+    startup_task_times[name] = round(time.perf_counter() - started, 3)
+
+
+def import_time_report():
+    total = sum(blueprint_import_times.values())
+    parts = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in blueprint_import_times.items())
+    report = f"Imported blueprints in {total:.2f}s ({parts})"
+    if startup_task_times:
+        tasks = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in startup_task_times.items())
+        report += f"; startup tasks: {tasks}"
+    return report
@@ -2,10 +2,130 @@ from flask import Blueprint, request, jsonify
 import os
 import json
 import time
+import threading
 from datetime import datetime
 
 templates_bp = Blueprint('templates', __name__)
 
+TEMPLATES_DIR = "templates"
+
+# Seconds between full per-file mtime sweeps (catches in-place edits made outside this process)
+TEMPLATE_RESCAN_INTERVAL = float(os.getenv("TEMPLATE_RESCAN_INTERVAL", "30"))
+
+
+class TemplateIndex:
+    """
+    Process-level index of the template files in a directory.
+
+    Templates are held by id and by (name, category). The directory mtime is
+    checked on every access and the files are only re-read when it changed
+    (files added, removed or renamed) or when TEMPLATE_RESCAN_INTERVAL has
+    elapsed; even then only files whose own mtime changed are parsed again.
+    Writes made through this blueprint update the index directly.
+    """
+
+    def __init__(self, templates_dir):
+        self.templates_dir = templates_dir
+        self._lock = threading.Lock()
+        self._dir_mtime = None
+        self._last_scan = 0.0
+        self._files = {}  # filename -> (mtime_ns, template_data)
+        self._by_id = {}
+        self._by_name_category = {}
+        self._sorted = None
+
+    def _rebuild_lookups(self):
+        self._by_id = {}
+        self._by_name_category = {}
+        for filename in sorted(self._files):
+            template_data = self._files[filename][1]
+            template_id = template_data.get('templateId') or filename[:-len('.json')]
+            self._by_id[template_id] = template_data
+            self._by_name_category.setdefault((template_data.get('name'), template_data.get('category')), template_data)
+        self._sorted = None
+
+    def _refresh(self):
+        try:
+            dir_mtime = os.stat(self.templates_dir).st_mtime_ns
+        except FileNotFoundError:
+            if self._files:
+                self._files = {}
+                self._rebuild_lookups()
+            self._dir_mtime = None
+            return
+
+        now = time.monotonic()
+        if dir_mtime == self._dir_mtime and now - self._last_scan < TEMPLATE_RESCAN_INTERVAL:
+            return
+
+        changed = False
+        seen = set()
+        with os.scandir(self.templates_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.json'):
+                    continue
+                seen.add(entry.name)
+                try:
+                    mtime = entry.stat().st_mtime_ns
+                    cached = self._files.get(entry.name)
+                    if cached and cached[0] == mtime:
+                        continue
+                    with open(entry.path, 'r') as f:
+                        self._files[entry.name] = (mtime, json.load(f))
+                    changed = True
+                except Exception as e:
+                    if self._files.pop(entry.name, None) is not None:
+                        changed = True
+
+        for filename in set(self._files) - seen:
+            del self._files[filename]
+            changed = True
+
+        if changed:
+            self._rebuild_lookups()
+        self._dir_mtime = dir_mtime
+        self._last_scan = now
+
+    def get(self, template_id):
+        with self._lock:
+            self._refresh()
+            return self._by_id.get(template_id)
+
+    def find(self, name, category):
+        """Return the template with this name and category, or None."""
+        with self._lock:
+            self._refresh()
+            return self._by_name_category.get((name, category))
+
+    def sorted_templates(self):
+        """Return all templates, most recently modified first (cached until the index changes)."""
+        with self._lock:
+            self._refresh()
+            if self._sorted is None:
+                self._sorted = sorted(self._by_id.values(), key=lambda x: x.get('lastModified', ''), reverse=True)
+            return self._sorted
+
+    def store(self, template_file, template_data):
+        """Record a template this process just wrote to template_file."""
+        with self._lock:
+            self._refresh()
+            self._files[os.path.basename(template_file)] = (os.stat(template_file).st_mtime_ns, template_data)
+            self._dir_mtime = os.stat(self.templates_dir).st_mtime_ns
+            self._rebuild_lookups()
+
+    def discard(self, template_file):
+        """Forget a template this process just deleted."""
+        with self._lock:
+            self._refresh()
+            if self._files.pop(os.path.basename(template_file), None) is not None:
+                self._rebuild_lookups()
+            if os.path.exists(self.templates_dir):
+                self._dir_mtime = os.stat(self.templates_dir).st_mtime_ns
+
+
+template_index = TemplateIndex(TEMPLATES_DIR)
+
+
 @templates_bp.route('/save_template', methods=['POST'])
 def save_template():
     try:
@@ -39,13 +159,14 @@ def save_template():
         }
 
         # Save template to a JSON file
-        templates_dir = "templates"
+        templates_dir = TEMPLATES_DIR
         if not os.path.exists(templates_dir):
             os.makedirs(templates_dir)
 
         template_file = os.path.join(templates_dir, f"{template_id}.json")
         with open(template_file, 'w') as f:
             json.dump(template_data, f, indent=2)
+        template_index.store(template_file, template_data)
 
         return jsonify({
             "message": "Template saved successfully",
@@ -59,22 +180,8 @@ def save_template():
 @templates_bp.route('/list_templates', methods=['GET'])
 def list_templates():
     try:
-        templates_dir = "templates"
-        if not os.path.exists(templates_dir):
-            return jsonify({"templates": []}), 200
-
-        templates = []
-        for filename in os.listdir(templates_dir):
-            if filename.endswith('.json'):
-                try:
-                    with open(os.path.join(templates_dir, filename), 'r') as f:
-                        template_data = json.load(f)
-                        templates.append(template_data)
-                except Exception as e:
-                    continue
-
-        # Sort templates by last modified date
-        templates.sort(key=lambda x: x.get('lastModified', ''), reverse=True)
+        # Templates sorted by last modified date, served from the in-memory index
+        templates = template_index.sorted_templates()
         
         return jsonify({"templates": templates}), 200
 
@@ -91,12 +198,13 @@ def delete_template():
         if not template_id:
             return jsonify({"error": "Template ID is required"}), 400
         
-        template_file = os.path.join("templates", f"{template_id}.json")
+        template_file = os.path.join(TEMPLATES_DIR, f"{template_id}.json")
         
         if not os.path.exists(template_file):
             return jsonify({"error": "Template not found"}), 404
 
         os.remove(template_file)
+        template_index.discard(template_file)
         
         return jsonify({"message": "Template deleted successfully"}), 200
 
@@ -114,23 +222,12 @@ def check_template_exists():
         if not template_name or not template_category:
             return jsonify({"error": "Template name and category are required"}), 400
         
-        templates_dir = "templates"
-        if not os.path.exists(templates_dir):
-            return jsonify({"exists": False}), 200
-
-        for filename in os.listdir(templates_dir):
-            if filename.endswith('.json'):
-                try:
-                    with open(os.path.join(templates_dir, filename), 'r') as f:
-                        template_data = json.load(f)
-                        if (template_data.get('name') == template_name and 
-                            template_data.get('category') == template_category):
-                            return jsonify({
-                                "exists": True,
-                                "templateId": template_data.get('templateId')
-                            }), 200
-                except Exception as e:
-                    continue
+        template = template_index.find(template_name, template_category)
+        if template is not None:
+            return jsonify({
+                "exists": True,
+                "templateId": template.get('templateId')
+            }), 200
 
         return jsonify({"exists": False}), 200
 
@@ -148,12 +245,14 @@ def update_template():
             return jsonify({"error": "Template ID is required"}), 400
         
         # Load existing template to preserve metadata
-        template_file = os.path.join("templates", f"{template_id}.json")
+        template_file = os.path.join(TEMPLATES_DIR, f"{template_id}.json")
         if not os.path.exists(template_file):
             return jsonify({"error": "Template not found"}), 404
 
-        with open(template_file, 'r') as f:
-            existing_template = json.load(f)
+        existing_template = template_index.get(template_id)
+        if existing_template is None:
+            with open(template_file, 'r') as f:
+                existing_template = json.load(f)
 
         # Update template data while preserving metadata
         updated_template = {
@@ -175,6 +274,7 @@ def update_template():
         # Save updated template
         with open(template_file, 'w') as f:
             json.dump(updated_template, f, indent=2)
+        template_index.store(template_file, updated_template)
 
         return jsonify({
             "message": "Template updated successfully",
@@ -0,0 +1,337 @@
+import re
+from ctm_python_client.core.workflow import *
+from ctm_python_client.core.comm import *
+from aapi import *
+from job_library import JOB_LIBRARY, create_job
+from json_stream import JSONStreamParser
+from json_repair import parse_model_json, repair_stats, JSONRepairError, TruncatedJSONError
+
+
+class UnknownJobTypeError(ValueError):
+    """Raised when a workflow job references a type that is not in JOB_LIBRARY."""
+
+    def __init__(self, job_type):
+        super().__init__(f"Unknown job type: {job_type}")
+        self.job_type = job_type
+
+
+def sanitize_name(name, user_code):
+    """
+    Sanitize names to follow the naming standard: [usercode]-* with only letters, digits, and hyphens.
+
+    Args:
+        name (str): The original name to sanitize
+        user_code (str): The user code to prefix the name with
+
+    Returns:
+        str: Sanitized name in format [usercode]-[sanitized-name]
+    """
+    # Remove any existing user code prefix if present
+    if name.startswith(f"{user_code}-"):
+        name = name[len(f"{user_code}-"):]
+
+    # Replace any non-alphanumeric characters with hyphens
+    sanitized = re.sub(r'[^a-zA-Z0-9]', '-', name)
+
+    # Remove multiple consecutive hyphens
+    sanitized = re.sub(r'-+', '-', sanitized)
+
+    # Remove leading and trailing hyphens
+    sanitized = sanitized.strip('-')
+
+    # Ensure the name is not empty after sanitization
+    if not sanitized:
+        sanitized = "default"
+
+    # Convert to lowercase
+    sanitized = sanitized.lower()
+
+    # Add user code prefix
+    return f"{user_code}-{sanitized}"
+
+
+def _build_subfolder(subfolder_name, events):
+    """Create a SubFolder carrying the add/wait/delete events of an AI subfolder entry."""
+    subfolder = SubFolder(subfolder_name)
+
+    if events.get('add'):
+        subfolder.events_to_add.append(AddEvents(
+            [Event(event=event, date=Event.Date.OrderDate) for event in events['add']]))
+
+    if events.get('wait'):
+        subfolder.wait_for_events.append(WaitForEvents(
+            [Event(event=event, date=Event.Date.OrderDate) for event in events['wait']]))
+
+    if events.get('delete'):
+        subfolder.delete_events_list.append(DeleteEvents(
+            [Event(event=event, date=Event.Date.OrderDate) for event in events['delete']]))
+
+    return subfolder
+
+
+class WorkflowBuilder:
+    """
+    Compile the AI workflow shape into a Workflow one subfolder and job at a time.
+
+    Entries can be added while the model is still generating them: subfolders
+    and jobs that arrive before the folder name, and jobs whose subfolder has
+    not been seen while the subfolder list is still open, are held back and
+    placed (in their original order) as soon as possible. Job types are
+    checked on arrival so an unknown type aborts the generation early.
+
+    Subfolder objects, sanitized subfolder paths and job ids/names are kept in
+    lookup tables so that placing a job and resolving its "wait_for_jobs"
+    dependencies never rescans the input lists.
+    """
+
+    def __init__(self, workflow, controlm_server, user_code, sanitize_job_names=True, connect_dependencies=False):
+        self.workflow = workflow
+        self.controlm_server = controlm_server
+        self.user_code = user_code
+        self.sanitize_job_names = sanitize_job_names
+        self.connect_dependencies = connect_dependencies
+
+        self._clear()
+
+    def reset(self):
+        """Discard everything added so far, including the folder already added to the workflow."""
+        self.workflow.clear_all()
+        self._clear()
+
+    def _clear(self):
+        # Set when the workflow was compiled from a completion cut off after its first complete subfolder and job
+        self.truncated = False
+        self.folder = None
+        self.folder_name = None
+        self.subfolders_data = []
+        self.jobs_data = []
+
+        self._subfolders_closed = False
+        self._subfolder_table = {}  # original name -> (SubFolder, full path)
+        self._pending_jobs = []
+        self._concurrent_groups = {}
+        self._job_instances = {}
+        self._job_paths = {}
+        self._job_ids_by_name = {}
+
+    def set_folder(self, folder_name):
+        """Create the main folder (folder_name already formatted) and place the entries waiting for it."""
+        if self.folder is not None:
+            return
+        self.folder_name = folder_name
+        self.folder = Folder(folder_name, site_standard="Empty", controlm_server=self.controlm_server)
+        self.workflow.add(self.folder)
+        for subfolder_data in self.subfolders_data:
+            self._place_subfolder(subfolder_data)
+        self._place_pending_jobs()
+
+    def add_subfolder(self, subfolder_data):
+        self.subfolders_data.append(subfolder_data)
+        if self.folder is not None:
+            self._place_subfolder(subfolder_data)
+            self._place_pending_jobs()
+
+    def close_subfolders(self):
+        """Mark the subfolder list complete; jobs naming an unknown subfolder then go to the main folder."""
+        self._subfolders_closed = True
+        self._place_pending_jobs()
+
+    def add_job(self, job_data):
+        """
+        Add a job entry.
+
+        Raises:
+            UnknownJobTypeError: If the job type is not present in JOB_LIBRARY
+        """
+        if job_data['type'] not in JOB_LIBRARY:
+            raise UnknownJobTypeError(job_data['type'])
+        self.jobs_data.append(job_data)
+        self._pending_jobs.append(job_data)
+        self._place_pending_jobs()
+
+    def add_workflow(self, folder_name, subfolders_data, jobs_data):
+        """Add a complete workflow (folder_name already formatted)."""
+        self.set_folder(folder_name)
+        for subfolder_data in subfolders_data:
+            self.add_subfolder(subfolder_data)
+        self.close_subfolders()
+        for job_data in jobs_data:
+            self.add_job(job_data)
+
+    def _place_subfolder(self, subfolder_data):
+        subfolder_name = sanitize_name(subfolder_data['name'], self.user_code)
+        subfolder = _build_subfolder(subfolder_name, subfolder_data.get('events') or {})
+        self.folder.sub_folder_list.append(subfolder)
+        self._subfolder_table[subfolder_data['name']] = (subfolder, f"{self.folder_name}/{subfolder_name}")
+
+    def _place_pending_jobs(self):
+        if self.folder is None:
+            return
+        while self._pending_jobs:
+            job_data = self._pending_jobs[0]
+            if not self._subfolders_closed and job_data.get('subfolder') not in self._subfolder_table:
+                return
+            self._pending_jobs.pop(0)
+            self._place_job(job_data)
+
+    def _place_job(self, job_data):
+        job_id = job_data['id']
+        job = create_job(job_data['type'])
+        job.object_name = sanitize_name(job_data['name'], self.user_code) if self.sanitize_job_names else job_data['name']
+
+        # Place the job directly into its container; equivalent to workflow.add(job, inpath=...)
+        # without walking the container's job list on every insert.
+        container, container_path = self._subfolder_table.get(
+            job_data.get('subfolder'), (self.folder, self.folder_name))
+        self.workflow._apply_defaults_for_job(job)
+        container.job_list.append(job)
+
+        self._job_instances[job_id] = job
+        self._job_paths[job_id] = f"{container_path}/{job.object_name}"
+        self._job_ids_by_name.setdefault(job_data['name'], job_id)
+
+        # Group jobs by concurrent groups within subfolders
+        group_subfolder = job_data.get('subfolder', '')
+        group_name = job_data.get('concurrent_group', 'default')
+        self._concurrent_groups.setdefault(group_subfolder, {}).setdefault(group_name, []).append(job_id)
+
+    def finish(self):
+        """
+        Place any remaining jobs and add the concurrent group events and job dependencies.
+
+        Returns:
+            dict: "folder", "job_instances" (id -> job), "job_paths" (id -> path)
+                  and "concurrent_groups" (subfolder -> group -> [job ids])
+
+        Raises:
+            ValueError: If no folder name was set
+        """
+        if self.folder is None:
+            raise ValueError("Workflow has no folder name")
+        self.close_subfolders()
+
+        job_instances = self._job_instances
+        concurrent_groups = self._concurrent_groups
+
+        # Add completion events for concurrent groups
+        for subfolder_name, groups in concurrent_groups.items():
+            for group_name, job_ids in groups.items():
+                if len(job_ids) > 1:  # Only create events for actual concurrent groups
+                    completion_event = f"{subfolder_name}_{group_name}_COMPLETE"
+                    for job_id in job_ids:
+                        job_instances[job_id].events_to_add.append(AddEvents([Event(event=completion_event)]))
+
+        # Create job dependencies based on wait_for_jobs (dependencies are referenced by job name)
+        if self.connect_dependencies:
+            for job_data in self.jobs_data:
+                for dependency_name in job_data.get('wait_for_jobs') or []:
+                    dep_job_id = self._job_ids_by_name.get(dependency_name)
+                    if dep_job_id is not None:
+                        self.workflow.connect(self._job_paths[dep_job_id], self._job_paths[job_data['id']])
+
+        return {
+            "folder": self.folder,
+            "job_instances": job_instances,
+            "job_paths": self._job_paths,
+            "concurrent_groups": concurrent_groups
+        }
+
+
+def compile_workflow(workflow, folder_name, controlm_server, subfolders_data, jobs_data, user_code,
+                     sanitize_job_names=True, connect_dependencies=False):
+    """
+    Compile the AI workflow shape ({"subfolders": [...], "jobs": [...]}) into a Workflow.
+
+    Args:
+        workflow (Workflow): Workflow with environment and defaults already set
+        folder_name (str): Formatted name of the main folder
+        controlm_server (str): Control-M server the folder is deployed to
+        subfolders_data (list): Subfolder entries with name and events
+        jobs_data (list): Job entries with id, name, type, subfolder and concurrent_group
+        user_code (str): The user code used to sanitize names
+        sanitize_job_names (bool): Apply sanitize_name to job names (otherwise used as-is)
+        connect_dependencies (bool): Connect jobs to the jobs named in their "wait_for_jobs"
+
+    Returns:
+        dict: "folder", "job_instances" (id -> job), "job_paths" (id -> path)
+              and "concurrent_groups" (subfolder -> group -> [job ids])
+
+    Raises:
+        UnknownJobTypeError: If a job type is not present in JOB_LIBRARY
+    """
+    builder = WorkflowBuilder(workflow, controlm_server, user_code, sanitize_job_names, connect_dependencies)
+    builder.add_workflow(folder_name, subfolders_data, jobs_data)
+    return builder.finish()
+
+
+def _has_complete_subfolder(document):
+    """Whether a (repaired) workflow document has a folder name and a listed subfolder holding a job."""
+    subfolder_names = {entry.get('name') for entry in document.get('subfolders') or [] if isinstance(entry, dict)}
+    return isinstance(document.get('folder_name'), str) and any(
+        isinstance(job, dict) and job.get('subfolder') in subfolder_names for job in document.get('jobs') or [])
+
+
+def compile_workflow_stream(builder, chunks, source="workflow_stream"):
+    """
+    Feed a streamed completion into a WorkflowBuilder while it is being generated.
+
+    The folder, each subfolder and each job are added to the workflow as soon
+    as their JSON closes, so compilation overlaps with generation. If the
+    completion turns out malformed, the whole text is repaired locally (see
+    json_repair) and the builder is refilled from the result. A truncated
+    completion is cut back to its last complete job and kept if it still
+    holds a subfolder with at least one job; builder.truncated is then set so
+    callers do not reuse the partial workflow. Otherwise it is rejected.
+    The builder's finish() is left to the caller (e.g. to add jobs first).
+
+    Args:
+        builder (WorkflowBuilder): Builder of the workflow under construction
+        chunks (iterable): Text chunks of the completion
+        source (str): Caller name used in the JSON repair metrics
+
+    Returns:
+        dict: The complete parsed workflow document
+
+    Raises:
+        TruncatedJSONError: If the completion was cut off before its first complete subfolder and job
+        JSONRepairError: If the completion cannot be repaired into a JSON object
+        UnknownJobTypeError: If a job type is not present in JOB_LIBRARY
+    """
+    parser = JSONStreamParser()
+    chunks = iter(chunks)
+    try:
+        for chunk in chunks:
+            for event in parser.feed(chunk):
+                kind, key = event[0], event[1]
+                if kind == "member" and key == "folder_name":
+                    builder.set_folder(sanitize_name(event[2], builder.user_code))
+                elif kind == "item" and key == "subfolders":
+                    builder.add_subfolder(event[2])
+                elif kind == "end" and key == "subfolders":
+                    builder.close_subfolders()
+                elif kind == "item" and key == "jobs":
+                    builder.add_job(event[2])
+            if parser.done:
+                break
+        document = parser.result()
+        repair_stats.record(source, "clean")
+        return document
+    except UnknownJobTypeError:
+        raise
+    except ValueError as e:
+        print(f"Streamed workflow JSON is malformed ({str(e)}), repairing the completion")
+
+    repairs = []
+    document = parse_model_json(parser.text + "".join(chunks), source, allow_truncated=True, repairs=repairs)
+    if not isinstance(document, dict):
+        raise JSONRepairError("Workflow JSON is not an object")
+    truncated = "truncated" in repairs
+    if truncated and not _has_complete_subfolder(document):
+        raise TruncatedJSONError("Workflow JSON was cut off before its first complete subfolder and job")
+    builder.reset()
+    builder.truncated = truncated
+    if isinstance(document.get('folder_name'), str):
+        builder.add_workflow(
+            sanitize_name(document['folder_name'], builder.user_code),
+            document.get('subfolders') or [], document.get('jobs') or [])
+    return document
@@ -0,0 +1,263 @@
+import re
+import json
+import time
+import random
+import string
+import threading
+from ctm_python_client.core.workflow import BaseWorkflow, WorkflowDefaults
+from aapi import Folder, JobDummy
+from job_library import JOB_LIBRARY, create_job, _library_fingerprint
+
+# Workflow defaults filled in per request; fragments hold a placeholder for each
+_DEFAULT_FIELDS = ('run_as', 'host', 'application', 'sub_application')
+
+# Folder attributes filled in per request
+_FOLDER_FIELDS = ('controlm_server', 'site_standard')
+
+# Job attributes Workflow.connect() appends to; jobs that already carry events are not spliced
+_EVENT_FIELDS = (
+    'events_to_add', 'wait_for_events', 'events_to_delete',
+    'add_events_list', 'wait_for_events_list', 'delete_events_list'
+)
+
+# Serialized form of a placeholder: json.dumps escapes the NUL characters around the field name
+_PLACEHOLDER = re.compile(r'\\u0000(\w+)\\u0000')
+_SENTINEL_JOB = '\x00jobs\x00'
+
+# Event containers get a random attribute name, as AddEvents/WaitForEvents/DeleteEvents do
+_EVENT_KEY_SUFFIX = re.compile(r'^(eventsToAdd|waitForEvents|eventsToDelete)_[A-Za-z0-9]{8}$')
+
+
+def _placeholder(field):
+    return f'\x00{field}\x00'
+
+
+def _event_container(kind, container_type, event_name):
+    suffix = ''.join(random.choices(string.ascii_letters + string.digits, k=8))
+    return f'"{kind}_{suffix}": {{"Type": "{container_type}", "Events": [{{"Event": {json.dumps(event_name)}}}]}}'
+
+
+def _library_job(key):
+    """A job straight from its JOB_LIBRARY factory, bypassing the create_job prototypes."""
+    return JOB_LIBRARY[key]()
+
+
+def _chain_workflow(job_keys, folder_name, folder_values, default_values, job_factory=create_job):
+    """Build a linear chain of library jobs as a Workflow object graph (the reference the fragments must match)."""
+    workflow = BaseWorkflow(WorkflowDefaults(**default_values))
+    workflow.add(Folder(folder_name, **folder_values))
+
+    job_paths = []
+    for job_key in job_keys:
+        job = job_factory(job_key)
+        workflow.add(job, inpath=folder_name)
+        job_paths.append(f"{folder_name}/{job.object_name}")
+
+    for i in range(len(job_paths) - 1):
+        workflow.connect(job_paths[i], job_paths[i + 1])
+    return workflow
+
+
+def _normalize(document):
+    """Parse workflow JSON with the random suffixes of event container names removed, for comparisons."""
+    def strip(value):
+        if isinstance(value, dict):
+            return {_EVENT_KEY_SUFFIX.sub(r'\1', key): strip(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [strip(item) for item in value]
+        return value
+    return strip(json.loads(document))
+
+
+class JobFragmentCache:
+    """
+    Pre-serialized Automation API JSON of every JOB_LIBRARY entry.
+
+    Preview and download endpoints return a folder holding a linear chain of
+    library jobs. Instead of building the Workflow object graph and calling
+    dumps_json() on every request, each job is serialized once (with
+    placeholders for the per-request workflow defaults) and a response is
+    assembled by splicing those fragments into the folder wrapper together with
+    the add/wait/delete events that Workflow.connect() would generate.
+
+    A self-test renders the whole catalog both ways (the object graph from the
+    raw JOB_LIBRARY factories) and compares the results; entries that do not
+    match, cannot be built, or already carry events are left out and rendered
+    through the object graph instead. The cache is built on first use (or by
+    warm_up() at startup) and rebuilt when JOB_LIBRARY entries are added or
+    replaced.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self._fragments = {}  # key -> (object name, serialized job with placeholders)
+        self._folder = None   # (head, tail) of the serialized folder around its jobs
+        self._stats = {"spliced": 0, "fallback": 0}
+        self._self_test = {}
+
+    def _build_fragment(self, key):
+        job = create_job(key)
+        if any(getattr(job, field, None) for field in _EVENT_FIELDS):
+            raise ValueError("job defines its own events")
+        workflow = BaseWorkflow(WorkflowDefaults(**{field: _placeholder(field) for field in _DEFAULT_FIELDS}))
+        workflow._apply_defaults_for_job(job)
+        return job.object_name, json.dumps(job.as_aapi_dict())
+
+    def _build_folder(self):
+        workflow = BaseWorkflow(WorkflowDefaults(**{field: _placeholder(field) for field in _DEFAULT_FIELDS}))
+        folder = Folder(_placeholder('folder_name'), **{field: _placeholder(field) for field in _FOLDER_FIELDS})
+        workflow.add(folder)
+        folder.job_list.append(JobDummy(_SENTINEL_JOB))
+
+        items = list(folder.as_aapi_dict().items())
+        index = [key for key, _ in items].index(_SENTINEL_JOB)
+        head = json.dumps(dict(items[:index]))[:-1]
+        tail = json.dumps(dict(items[index + 1:]))[1:]
+        return head, tail
+
+    def _run_self_test(self, fragments):
+        """Render the catalog through the object graph and the fragments; drop entries whose output differs."""
+        folder_values = {field: f"selftest-{field}" for field in _FOLDER_FIELDS}
+        default_values = {field: f"selftest-{field}" for field in _DEFAULT_FIELDS}
+        failed = {}
+        for key in list(fragments):
+            try:
+                # Each entry is checked between two others so it is tested as event source and target
+                neighbours = []
+                for other in fragments:
+                    if fragments[other][0] not in [fragments[k][0] for k in neighbours + [key]]:
+                        neighbours.append(other)
+                    if len(neighbours) == 2:
+                        break
+                keys = neighbours[:1] + [key] + neighbours[1:]
+                # The reference comes from the raw factories, so a bad create_job prototype fails the test
+                expected = _chain_workflow(keys, "selftest", folder_values, default_values,
+                                           job_factory=_library_job).dumps_json()
+                actual = self._render(fragments, keys, "selftest", folder_values, default_values)
+                if _normalize(actual) != _normalize(expected):
+                    failed[key] = "spliced JSON differs from Workflow.dumps_json()"
+            except Exception as e:
+                failed[key] = str(e)
+        return failed
+
+    def _ensure_built(self):
+        fingerprint = _library_fingerprint()
+        if self._fingerprint == fingerprint:
+            return
+        with self._lock:
+            if self._fingerprint == fingerprint:
+                return
+            started = time.perf_counter()
+            self._folder = self._build_folder()
+
+            fragments = {}
+            skipped = {}
+            for key in JOB_LIBRARY:
+                try:
+                    fragments[key] = self._build_fragment(key)
+                except Exception as e:
+                    skipped[key] = str(e)
+
+            failed = self._run_self_test(fragments)
+            for key in failed:
+                del fragments[key]
+            skipped.update(failed)
+            for key, reason in skipped.items():
+                print(f"WARNING: {key} is rendered through the Workflow object graph: {reason}")
+
+            self._fragments = fragments
+            self._self_test = {
+                "spliceable": len(fragments),
+                "skipped": skipped,
+                "catalog_size": len(JOB_LIBRARY),
+                "build_seconds": round(time.perf_counter() - started, 3)
+            }
+            self._fingerprint = fingerprint
+
+    def _render(self, fragments, job_keys, folder_name, folder_values, default_values):
+        names = [fragments[key][0] for key in job_keys]
+        events = [f"{src.replace(' ', '_')}-TO-{dst.replace(' ', '_')}" for src, dst in zip(names, names[1:])]
+
+        jobs = []
+        for i, key in enumerate(job_keys):
+            name, fragment = fragments[key]
+            containers = []
+            if i > 0:
+                containers.append(_event_container("waitForEvents", "WaitForEvents", events[i - 1]))
+            if i < len(events):
+                containers.append(_event_container("eventsToAdd", "AddEvents", events[i]))
+            if i > 0:
+                containers.append(_event_container("eventsToDelete", "DeleteEvents", events[i - 1]))
+            if containers:
+                fragment = f"{fragment[:-1]}, {', '.join(containers)}}}"
+            jobs.append(f"{json.dumps(name)}: {fragment}")
+
+        head, tail = self._folder
+        body = head
+        if jobs:
+            body += ", " + ", ".join(jobs)
+        if tail != "}":
+            body += ", " + tail
+        else:
+            body += tail
+
+        values = {"folder_name": folder_name, **folder_values, **default_values}
+        document = f'{{"{_placeholder("folder_name")}": {body}}}'.replace('\x00', '\\u0000')
+        return _PLACEHOLDER.sub(lambda match: json.dumps(values[match.group(1)])[1:-1], document)
+
+    def chain_workflow_json(self, job_keys, folder_name, site_standard, controlm_server, **defaults):
+        """
+        Automation API JSON of a folder holding the library jobs chained in order.
+
+        Equivalent to adding create_job(key) for each key to a Workflow with the
+        given defaults, connecting each job to the next and calling dumps_json().
+
+        Args:
+            job_keys (list): JOB_LIBRARY keys, in chain order
+            folder_name (str): Name of the folder
+            site_standard (str): Site standard of the folder
+            controlm_server (str): Control-M server of the folder
+            **defaults: Workflow defaults (run_as, host, application, sub_application)
+
+        Returns:
+            tuple: (raw JSON, object names of the jobs in order)
+
+        Raises:
+            KeyError: If a key is not in JOB_LIBRARY
+        """
+        for job_key in job_keys:
+            if job_key not in JOB_LIBRARY:
+                raise KeyError(job_key)
+        self._ensure_built()
+
+        folder_values = {"site_standard": site_standard, "controlm_server": controlm_server}
+        default_values = {field: defaults.get(field) for field in _DEFAULT_FIELDS}
+        fragments = self._fragments
+        names = [fragments[key][0] if key in fragments else None for key in job_keys]
+
+        # Repeated job names, entries without a fragment, unset values and folder paths go through the object graph
+        if (None in names or len(set(names)) < len(names) or '/' in folder_name
+                or not all(default_values.values()) or None in folder_values.values()):
+            with self._lock:
+                self._stats["fallback"] += 1
+            workflow = _chain_workflow(job_keys, folder_name, folder_values,
+                                       {field: value for field, value in default_values.items() if value})
+            job_names = [job.object_name for job in workflow.get(folder_name).job_list]
+            return workflow.dumps_json(), job_names
+
+        with self._lock:
+            self._stats["spliced"] += 1
+        return self._render(fragments, job_keys, folder_name, folder_values, default_values), names
+
+    def warm_up(self):
+        """Serialize the catalog and run the self-test now (at startup) rather than on first use."""
+        self._ensure_built()
+
+    def stats(self):
+        self._ensure_built()
+        with self._lock:
+            return {**self._stats, "self_test": dict(self._self_test)}
+
+
+job_fragments = JobFragmentCache()
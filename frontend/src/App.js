@@ -15,6 +15,32 @@ const API_BASE_URL = process.env.REACT_APP_API_URL;
 console.log("API_BASE_URL:", API_BASE_URL);
 console.log("Environment variable:", process.env.REACT_APP_API_URL);
 
+// Poll a queued deploy until it finishes; resolves with the deploy result
+const waitForDeploy = async (deployId, onStage) => {
+  let version;
+  for (;;) {
+    const query = version === undefined ? "" : `?since=${version}&wait=25`;
+    const response = await fetch(`${API_BASE_URL}/deploys/${deployId}${query}`);
+    const record = await response.json();
+    if (!response.ok) {
+      throw new Error(record.error || "Failed to get deploy status");
+    }
+    if (record.stage === "succeeded") {
+      return record.result;
+    }
+    if (record.stage === "failed") {
+      const result = record.result || {};
+      throw new Error(
+        result.error ||
+          (result.deployment_status && result.deployment_status.message) ||
+          "Deploy failed"
+      );
+    }
+    if (onStage) onStage(record.stage);
+    version = record.version;
+  }
+};
+
 function App() {
   const [workflow, setWorkflow] = useState([]);
   const [useCase, setUseCase] = useState("");
@@ -324,7 +350,10 @@ function App() {
         throw new Error(errorData.error || "Failed to deploy workflow");
       }
 
-      const deployData = await response.json();
+      const { deploy_id: deployId } = await response.json();
+      await waitForDeploy(deployId, (stage) =>
+        setStatus(`Deploying workflow (${stage})...`)
+      );
       setStatus("Workflow deployed successfully!");
       setTimeout(() => setStatus(""), 30000);
     } catch (error) {
@@ -1125,6 +1154,8 @@ function App() {
         throw new Error(errorData.error || "Failed to create workflow");
       }
 
+      const createData = await createResponse.json();
+
       // Now upload to GitHub
       const githubResponse = await fetch(
         `${API_BASE_URL}/importexport/upload-github`,
@@ -1136,6 +1167,7 @@ function App() {
           body: JSON.stringify({
             narrative_text: narrative,
             user_info: userCode,
+            workflow_id: createData.workflow_id,
           }),
         }
       );
@@ -1145,8 +1177,8 @@ function App() {
         throw new Error(errorData.error || "Failed to upload to GitHub");
       }
 
-      const githubData = await githubResponse.json();
-      setStatus("Successfully uploaded to GitHub!");
+      await githubResponse.json();
+      setStatus("Upload to GitHub queued; it will be committed shortly.");
       setShowGithubModal(false);
       setTimeout(() => setStatus(""), 30000);
     } catch (error) {
@@ -1278,7 +1310,10 @@ function App() {
         throw new Error(errorData.error || "Failed to deploy AI workflow");
       }
 
-      const data = await response.json();
+      const { deploy_id: deployId } = await response.json();
+      const data = await waitForDeploy(deployId, (stage) =>
+        setStatus(`🚀 Deploying AI workflow (${stage})...`)
+      );
       setAiWorkflowData(data);
       setStatus("✅ AI workflow deployed successfully!");
       setTimeout(() => setStatus(""), 30000);